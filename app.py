@@ -1,205 +1,125 @@
 import streamlit as st
-import pandas as pd
 import sqlite3
 import os
 import io
 
-# --- إعدادات السرعة والخرائط ---
-speed_data = {
-    "Vehicle": ["Car", "Sport", "Super", "Bigbike", "Moto", "ORV", "SUV", "Truck", "ATV"],
-    "expressway": [264, 432, 480, 264, 220.8, 286, 348, 240, 115.2],
-    "highway": [290.4, 480, 528, 230.4, 225.6, 240, 360, 276, 115.2],
-    "dirt": [153.6, 360, 264, 165.6, 144, 220.8, 336, 87.6, 187.2],
-    "potholes": [67.2, 57.6, 52.8, 187.2, 96, 134.4, 110.4, 108, 144],
-    "bumpy": [98.4, 168, 151.2, 259.2, 108, 218.4, 213.6, 216, 187.2],
-    "desert": [132, 96, 62.4, 132, 72, 58.08, 139.2, 98.28, 168]
-}
-
-hidden_roads_map = {
-    "expressway": ["highway", "bumpy"],
-    "highway": ["expressway", "dirt"],
-    "dirt": ["potholes", "desert"],
-    "potholes": ["dirt", "bumpy"],
-    "bumpy": ["highway", "potholes"],
-    "desert": ["dirt", "potholes"]
-}
-
-road_weights_config = {
-    "expressway": {"visible": 0.5, "hidden1": 0.25, "hidden2": 0.25},
-    "highway": {"visible": 0.5, "hidden1": 0.25, "hidden2": 0.25},
-    "dirt": {"visible": 0.3, "hidden1": 0.35, "hidden2": 0.35},
-    "potholes": {"visible": 0.3, "hidden1": 0.35, "hidden2": 0.35},
-    "bumpy": {"visible": 0.4, "hidden1": 0.3, "hidden2": 0.3},
-    "desert": {"visible": 0.2, "hidden1": 0.4, "hidden2": 0.4}
-}
-
-car_properties = {
-    "Car": {"weight": 1.0, "power": 1.0, "handling": 1.0},
-    "Sport": {"weight": 0.8, "power": 1.3, "handling": 1.2},
-    "Super": {"weight": 0.7, "power": 1.5, "handling": 1.4},
-    "Bigbike": {"weight": 0.6, "power": 1.2, "handling": 0.9},
-    "Moto": {"weight": 0.5, "power": 1.0, "handling": 0.8},
-    "ORV": {"weight": 1.3, "power": 1.1, "handling": 1.5},
-    "SUV": {"weight": 1.2, "power": 1.2, "handling": 1.3},
-    "Truck": {"weight": 1.5, "power": 1.0, "handling": 0.7},
-    "ATV": {"weight": 0.9, "power": 0.9, "handling": 1.6}
-}
-
-ROAD_PERCENTAGES = {
-    "visible": 0.27,
-    "long_hidden": 0.46,    "short_hidden": 0.27
-}
+# pandas و pyarrow (عبر backup) يُستوردان داخل الفروع التي تحتاجهما فقط، فلا يدفع أول عرض ثمنهما
+from history_store import HistoryStore
+from metrics import REGISTRY, timed, timer
+from race_codes import POSITIONS, ROADS, VEHICLES
+from race_table import RaceTable
+from racing_config import speed_data
+from storage import RaceStore, RACE_COLUMNS, race_to_row
 
 # --- نظام التخزين: SQLite (الأولوية) + CSV احتياطي ---
 DB_PATH = 'racing.db'
 CSV_PATH = 'racing_history.csv'
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS races (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            Position TEXT,
-            Road TEXT,
-            Hidden_Road_1 TEXT,
-            Hidden_Road_1_Position TEXT,
-            Hidden_Road_2 TEXT,
-            Hidden_Road_2_Position TEXT,
-            Long_Road TEXT,
-            Car1 TEXT,
-            Car2 TEXT,
-            Car3 TEXT,
-            Winner TEXT,
-            Prediction TEXT,
-            Prediction_Method TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
+@st.cache_resource
+def get_store():
+    return RaceStore(DB_PATH)
 
+@timed("load_history")
 def load_history():
     # محاولة التحميل من SQLite أولاً
     try:
-        init_db()
-        conn = sqlite3.connect(DB_PATH)
-        df = pd.read_sql_query("SELECT * FROM races", conn)
-        conn.close()
-        if not df.empty:
-            return df.drop(columns=['id']).to_dict('records')
-    except:
-        pass
+        history = get_store().load()
+        if history:
+            return history
+    except Exception as e:
+        print(f"SQLite error: {str(e)}")
     
     # إذا فشل SQLite، محاولة التحميل من CSV
     try:
         if os.path.exists(CSV_PATH):
+            import pandas as pd
             df = pd.read_csv(CSV_PATH)
             if 'Unnamed: 0' in df.columns:
                 df = df.drop(columns=['Unnamed: 0'])
-            return df.to_dict('records')
+            return RaceTable.from_races(df.to_dict('records'))
     except:
         pass
     
-    return []
+    return RaceTable()
 
-def save_history():
-    if not st.session_state.history:
+@timed("save_history")
+def save_races(races):
+    # حفظ السباقات الجديدة فقط (إضافة وليس استبدال الجدول)
+    if not races:
         return False
     
-    # الحفظ في SQLite
     try:
-        init_db()
-        conn = sqlite3.connect(DB_PATH)
-        df = pd.DataFrame(st.session_state.history)
-        
-        # إضافة أعمدة افتراضية إذا كانت مفقودة
-        required_columns = {
-            'Hidden_Road_1': 'dirt',
-            'Hidden_Road_1_Position': 'C',
-            'Hidden_Road_2': 'potholes',
-            'Hidden_Road_2_Position': 'R',
-            'Long_Road': 'المرئي'
-        }
-        for col, default_val in required_columns.items():
-            if col not in df.columns:
-                df[col] = default_val
-        
-        # التأكد من وجود جميع الأعمدة المطلوبة
-        df = df[[col for col in required_columns.keys() if col in df.columns] + 
-                [c for c in df.columns if c not in required_columns.keys()]]
-        
-        df.to_sql('races', conn, if_exists='replace', index=False)
-        conn.close()
+        get_store().append(races)
         return True
+    except sqlite3.OperationalError as e:
+        print(f"SQLite error: {str(e)}")
+        # القاعدة مشغولة بكاتب آخر حتى بعد مهلة الانتظار: لا نكتب نسخة موازية في CSV لن تُقرأ
+        if 'locked' in str(e) or 'busy' in str(e):
+            return False
     except Exception as e:
         print(f"SQLite error: {str(e)}")
     
-    # إذا فشل SQLite، الحفظ في CSV احتياطيًا
+    # إذا فشل SQLite، الإضافة إلى CSV احتياطيًا
     try:
-        df = pd.DataFrame(st.session_state.history)
-        df.to_csv(CSV_PATH, index=False)
+        import pandas as pd
+        df = pd.DataFrame([race_to_row(r) for r in races], columns=RACE_COLUMNS)
+        df.to_csv(CSV_PATH, mode='a', header=not os.path.exists(CSV_PATH), index=False)
         return True
     except:
         return False
 
+def stored_count():
+    # None إذا تعذر فتح قاعدة البيانات: يبقى التوقع مبدئيًا حتى يكتمل التحميل من CSV
+    try:
+        return get_store().count()
+    except Exception:
+        return None
+
+@st.cache_resource
+def get_history():
+    # سجل مشترك بين كل الجلسات بدل نسخة كاملة لكل مستخدم
+    return HistoryStore(load_history, save_races, stored_count)
+
 # --- تهيئة التطبيق ---
-if 'history' not in st.session_state:
-    st.session_state.history = load_history()
+history = get_history()
 
 # --- الشريط الجانبي ---st.sidebar.title("Racing Predictor Pro")
-page = st.sidebar.radio("اختر الصفحة", ["الرئيسية", "نسبة الربح"])
+pages = ["الرئيسية", "نسبة الربح"]
+# صفحة المقاييس مخفية: تظهر فقط مع ?admin=1
+if st.query_params.get("admin") == "1":
+    pages.append("المقاييس")
+page = st.sidebar.radio("اختر الصفحة", pages)
 
 # --- زر رفع البيانات ---
 st.sidebar.markdown("---")
 st.sidebar.subheader("📥 استعادة البيانات")
-uploaded_file = st.sidebar.file_uploader("ارفع ملف CSV", type=["csv"])
+uploaded_file = st.sidebar.file_uploader("ارفع ملف CSV أو Parquet", type=["csv", "parquet"])
 
-if uploaded_file is not None:
+if uploaded_file is not None and st.session_state.get('restored_file_id') != uploaded_file.file_id:
     try:
-        temp_df = pd.read_csv(uploaded_file)
-        if 'Unnamed: 0' in temp_df.columns:
-            temp_df = temp_df.drop(columns=['Unnamed: 0'])
+        from backup import import_csv, import_parquet
         
-        restored_history = []
-        for _, row in temp_df.iterrows():
-            # تحليل Hidden_Details للحصول على الطرق والمواقع
-            h1, p1, h2, p2 = ("dirt", "C", "potholes", "R")
-            if 'Hidden_Details' in row and pd.notna(row['Hidden_Details']):
-                parts = str(row['Hidden_Details']).split('+')
-                if len(parts) == 2:
-                    try:
-                        h1 = parts[0].split('(')[0].strip()
-                        p1 = parts[0].split('(')[1].replace(')', '').strip()
-                        h2 = parts[1].split('(')[0].strip()
-                        p2 = parts[1].split('(')[1].replace(')', '').strip()
-                    except:
-                        pass
-            
-            restored_history.append({
-                "Position": row.get("Position", "C"),
-                "Road": row.get("Road", "expressway"),
-                "Hidden_Road_1": h1,
-                "Hidden_Road_1_Position": p1,
-                "Hidden_Road_2": h2,
-                "Hidden_Road_2_Position": p2,
-                "Long_Road": row.get("Long_Road", "المرئي"),
-                "Car1": row.get("Car1", "Car"),
-                "Car2": row.get("Car2", "Sport"),
-                "Car3": row.get("Car3", "Super"),
-                "Winner": row.get("Winner", "Car"),
-                "Prediction": row.get("Prediction", row.get("Car1", "Car")),
-                "Prediction_Method": row.get("Prediction_Method", "Restored")
-            })
+        progress_bar = st.sidebar.progress(0.0)
+        file_size = max(uploaded_file.size, 1)
         
-        st.session_state.history = restored_history
+        def show_progress(rows):
+            done = min(uploaded_file.tell() / file_size, 1.0)
+            progress_bar.progress(done, text=f"{rows} سباق")
         
-        # حفظ البيانات
-        if save_history():
-            st.sidebar.success(f"✅ تم استعادة {len(restored_history)} سباق!")
-            st.sidebar.balloons()
-            st.rerun()
+        # استيراد على دفعات مباشرة إلى قاعدة البيانات
+        if uploaded_file.name.lower().endswith(".parquet"):
+            with timer("import_parquet"):
+                stats = import_parquet(uploaded_file, get_store(), progress=show_progress)
         else:
-            st.sidebar.error("❌ فشل الحفظ في قاعدة البيانات")
+            with timer("import_csv"):
+                stats = import_csv(uploaded_file, get_store(), progress=show_progress)
+        history.reload()
+        st.session_state.restored_file_id = uploaded_file.file_id
+        st.sidebar.success(f"✅ تم استعادة {stats['imported']} سباق!")
+        if stats['rejected']:
+            st.sidebar.warning(f"⚠️ تم تجاهل {stats['rejected']} صف غير صالح")
+        st.sidebar.balloons()
+        st.rerun()
     
     except Exception as e:
         st.sidebar.error(f"❌ خطأ في الرفع: {str(e)}")
@@ -209,7 +129,7 @@ st.sidebar.markdown("---")
 st.sidebar.subheader("📤 تصدير البيانات")
 if st.sidebar.button("تنزيل CSV"):
     try:
-        df_export = pd.DataFrame(st.session_state.history)
+        df_export = history.races.to_frame()
         csv_buffer = io.StringIO()
         df_export.to_csv(csv_buffer, index=False, encoding='utf-8-sig')
         st.sidebar.download_button(
@@ -221,6 +141,34 @@ if st.sidebar.button("تنزيل CSV"):
     except Exception as e:
         st.sidebar.error(f"❌ خطأ في التصدير: {str(e)}")
 
+# Parquet: الطرق المخفية أعمدة حقيقية، مع اختيار الأعمدة ونطاق أرقام السباقات
+with st.sidebar.expander("Parquet"):
+    export_columns = st.multiselect(
+        "الأعمدة", RACE_COLUMNS, default=RACE_COLUMNS, key="export_columns",
+        help="الملف الذي ينقصه أي عمود مطلوب للسباق يصلح للتحليل فقط ولا يمكن استعادته",
+    )
+    id_col1, id_col2 = st.columns(2)
+    export_min_id = id_col1.number_input("من رقم", min_value=0, value=0, step=1, key="export_min_id")
+    export_max_id = id_col2.number_input("إلى رقم (0 = الكل)", min_value=0, value=0, step=1, key="export_max_id")
+    if st.button("تنزيل Parquet"):
+        try:
+            from backup import export_parquet
+            
+            parquet_buffer = io.BytesIO()
+            with timer("export_parquet"):
+                exported = export_parquet(
+                    get_store(), parquet_buffer, columns=export_columns,
+                    min_id=export_min_id or None, max_id=export_max_id or None,
+                )
+            st.download_button(
+                label=f"⬇️ اضغط لتنزيل الملف ({exported} سباق)",
+                data=parquet_buffer.getvalue(),
+                file_name="racing_history_backup.parquet",
+                mime="application/vnd.apache.parquet"
+            )
+        except Exception as e:
+            st.error(f"❌ خطأ في التصدير: {str(e)}")
+
 # --- باقي التطبيق (الرئيسية ونسبة الربح) ---
 if page == "الرئيسية":
     st.title("Racing Predictor Pro")
@@ -240,146 +188,27 @@ if page == "الرئيسية":
     st.markdown("---")
     st.subheader("التنبؤ الذكي")
     
-    weight_map = {"L": 0.8, "C": 1.0, "R": 1.3}
-    weight = weight_map[position]
-    
-    hidden_roads = hidden_roads_map.get(road, ["dirt", "potholes"])
-    hidden_positions = ["C", "C"]
-    if st.session_state.history and len(st.session_state.history) > 20:
-        hist_temp = pd.DataFrame(st.session_state.history)
-        if 'Hidden_Road_1' in hist_temp.columns and 'Hidden_Road_1_Position' in hist_temp.columns:
-            road_matches = hist_temp[
-                (hist_temp['Road'] == road) & 
-                (hist_temp['Position'] == position)
-            ]
-            if not road_matches.empty:
-                road_matches['full_pair'] = (
-                    road_matches['Hidden_Road_1'] + ',' + 
-                    road_matches['Hidden_Road_1_Position'] + ',' +
-                    road_matches['Hidden_Road_2'] + ',' + 
-                    road_matches['Hidden_Road_2_Position']
-                )
-                mode_series = road_matches['full_pair'].mode()
-                if not mode_series.empty:
-                    parts = mode_series.iloc[0].split(',')
-                    if len(parts) == 4:
-                        hidden_roads = [parts[0], parts[2]]
-                        hidden_positions = [parts[1], parts[3]]
-    
-    long_road = "المرئي"
-    if st.session_state.history and len(st.session_state.history) > 20:
-        hist_temp = pd.DataFrame(st.session_state.history)
-        if 'Long_Road' in hist_temp.columns:
-            road_matches = hist_temp[
-                (hist_temp['Road'] == road) & 
-                (hist_temp['Position'] == position)
-            ]
-            if not road_matches.empty:
-                mode_series = road_matches['Long_Road'].mode()
-                if not mode_series.empty:
-                    long_road = mode_series.iloc[0]
-    
-    prediction_method = ""
-    
-    if st.session_state.history and len(st.session_state.history) > 20:
-        hist_df = pd.DataFrame(st.session_state.history)
-        
-        similar_matches = hist_df[
-            (hist_df['Position'] == position) &
-            (hist_df['Road'] == road) &
-            (hist_df['Car1'].isin(cars)) &
-            (hist_df['Car2'].isin(cars)) &
-            (hist_df['Car3'].isin(cars))
-        ]
-        
-        if len(similar_matches) >= 1:
-            win_counts = {}
-            for car in cars:
-                wins = len(similar_matches[similar_matches['Winner'] == car])
-                win_counts[car] = wins
-            
-            prediction = max(win_counts, key=win_counts.get)
-            prediction_method = "التاريخي (دقة عالية)"
-        else:
-            combined_times = []
-            
-            for car in cars:
-                car_idx = speed_data["Vehicle"].index(car)
-                visible_speed = speed_data[road][car_idx] * weight
-                
-                h1_weight = weight_map.get(hidden_positions[0], 1.0)
-                h2_weight = weight_map.get(hidden_positions[1], 1.0)
-                hidden_speed1 = speed_data[hidden_roads[0]][car_idx] * h1_weight
-                hidden_speed2 = speed_data[hidden_roads[1]][car_idx] * h2_weight
-                
-                if long_road == "المرئي":
-                    time_visible = ROAD_PERCENTAGES["long_hidden"] / visible_speed
-                    time_hidden1 = ROAD_PERCENTAGES["short_hidden"] / hidden_speed1
-                    time_hidden2 = ROAD_PERCENTAGES["short_hidden"] / hidden_speed2
-                elif long_road == "المخفي الأول":
-                    time_visible = ROAD_PERCENTAGES["short_hidden"] / visible_speed
-                    time_hidden1 = ROAD_PERCENTAGES["long_hidden"] / hidden_speed1
-                    time_hidden2 = ROAD_PERCENTAGES["short_hidden"] / hidden_speed2
-                else:  # المخفي الثاني
-                    time_visible = ROAD_PERCENTAGES["short_hidden"] / visible_speed
-                    time_hidden1 = ROAD_PERCENTAGES["short_hidden"] / hidden_speed1
-                    time_hidden2 = ROAD_PERCENTAGES["long_hidden"] / hidden_speed2
-                
-                total_time = time_visible + time_hidden1 + time_hidden2
-                
-                if road in ["dirt", "potholes", "desert", "bumpy"]:
-                    handling_factor = car_properties[car]["handling"]
-                    total_time *= (1.0 - handling_factor * 0.2)
-                else:
-                    power_factor = car_properties[car]["power"]
-                    total_time *= (1.0 / power_factor)
-                
-                combined_times.append(total_time)
-            
-            prediction = cars[combined_times.index(min(combined_times))]
-            prediction_method = f"المدمج (الطريق الأطول: {long_road})"
-    else:
-        combined_times = []
-        
-        for car in cars:
-            car_idx = speed_data["Vehicle"].index(car)
-            visible_speed = speed_data[road][car_idx] * weight
-            h1_weight = weight_map.get(hidden_positions[0], 1.0)
-            h2_weight = weight_map.get(hidden_positions[1], 1.0)
-            hidden_speed1 = speed_data[hidden_roads[0]][car_idx] * h1_weight
-            hidden_speed2 = speed_data[hidden_roads[1]][car_idx] * h2_weight
-            
-            if long_road == "المرئي":
-                time_visible = ROAD_PERCENTAGES["long_hidden"] / visible_speed
-                time_hidden1 = ROAD_PERCENTAGES["short_hidden"] / hidden_speed1
-                time_hidden2 = ROAD_PERCENTAGES["short_hidden"] / hidden_speed2
-            elif long_road == "المخفي الأول":
-                time_visible = ROAD_PERCENTAGES["short_hidden"] / visible_speed
-                time_hidden1 = ROAD_PERCENTAGES["long_hidden"] / hidden_speed1
-                time_hidden2 = ROAD_PERCENTAGES["short_hidden"] / hidden_speed2
-            else:
-                time_visible = ROAD_PERCENTAGES["short_hidden"] / visible_speed
-                time_hidden1 = ROAD_PERCENTAGES["short_hidden"] / hidden_speed1
-                time_hidden2 = ROAD_PERCENTAGES["long_hidden"] / hidden_speed2
-            
-            total_time = time_visible + time_hidden1 + time_hidden2
-            
-            if road in ["dirt", "potholes", "desert", "bumpy"]:
-                handling_factor = car_properties[car]["handling"]
-                total_time *= (1.0 - handling_factor * 0.2)
-            else:
-                power_factor = car_properties[car]["power"]
-                total_time *= (1.0 / power_factor)
-            
-            combined_times.append(total_time)
-        
-        prediction = cars[combined_times.index(min(combined_times))]
-        prediction_method = f"الوقت (الطريق الأطول: {long_road})"
+    with timer("predict"):
+        result = history.predict(position, road, cars)
+    prediction = result["prediction"]
+    prediction_method = result["method"]
+    hidden_roads = result["hidden_roads"]
+    hidden_positions = result["hidden_positions"]
     
     st.success(f"التنبؤ: **{prediction}**")
     st.caption(f"الطريقة: {prediction_method}")
+    if result.get("provisional"):
+        st.caption("⏳ السجل قيد التحميل: توقع مبدئي من جدول الفيزياء")
     st.caption(f"الطرق المخفية: {hidden_roads[0]} ({hidden_positions[0]}) + {hidden_roads[1]} ({hidden_positions[1]})")
     
+    # توزيع احتمالات الفوز على سيناريوهات الطرق المخفية من السجل
+    if st.toggle("احتمالات الفوز", key="win_probabilities"):
+        with timer("win_probabilities"):
+            probabilities = history.win_probabilities(position, road, cars)
+        for car, probability in sorted(probabilities.items(), key=lambda x: -x[1]):
+            st.write(f"**{car}**: {probability * 100:.1f}%")
+            st.progress(min(probability, 1.0))
+    
     st.markdown("---")
     actual_winner = st.selectbox("Actual Winner", cars)
     
@@ -396,7 +225,9 @@ if page == "الرئيسية":
         key="long_road"    )
     
     if st.button("Save This Race"):
-       st.session_state.history.append({
+        # التوقع المعروض قد يكون مبدئيًا أثناء التحميل؛ المحفوظ هو توقع السجل الكامل
+        saved = history.predict(position, road, cars, wait=True)
+        new_race = {
             "Position": position,
             "Road": road,
             "Hidden_Road_1": hidden_road1,
@@ -408,50 +239,65 @@ if page == "الرئيسية":
             "Car2": car2,
             "Car3": car3,
             "Winner": actual_winner,
-            "Prediction": prediction,
-            "Prediction_Method": prediction_method
-        })
-    if save_history():
+            "Prediction": saved["prediction"],
+            "Prediction_Method": saved["method"]
+        }
+        if history.append(new_race):
             st.balloons()
-            st.success(f"تم الحفظ! الإجمالي: {len(st.session_state.history)}")
-    else:
+            st.success(f"تم الحفظ! الإجمالي: {history.count()}")
+        else:
             st.error("فشل الحفظ! تأكد من الصلاحيات.")
     
-    if st.session_state.history:
+    # العدد من قاعدة البيانات لا من السجل في الذاكرة، فلا ينتظر العرض اكتمال التحميل
+    if get_store().count():
         st.markdown("---")
         st.subheader("سجل السباقات")
-        display_df = pd.DataFrame(st.session_state.history)
-        if 'Hidden_Road_1_Position' in display_df.columns and 'Long_Road' in display_df.columns:
-            display_df['Hidden_Details'] = (
-                display_df['Hidden_Road_1'] + ' (' + display_df['Hidden_Road_1_Position'] + ') + ' +
-                display_df['Hidden_Road_2'] + ' (' + display_df['Hidden_Road_2_Position'] + ')'
-            )
-            cols_to_show = ['Position', 'Road', 'Hidden_Details', 'Long_Road', 'Car1', 'Car2', 'Car3', 'Winner', 'Prediction']
-        else:
-            cols_to_show = ['Position', 'Road', 'Car1', 'Car2', 'Car3', 'Winner', 'Prediction']
+        # عرض صفحة واحدة فقط من قاعدة البيانات مع التصفية على الخادم
+        all_label = "الكل"
+        filter_cols = st.columns(4)
+        road_filter = filter_cols[0].selectbox("الطريق", [all_label] + ROADS, key="hist_road")
+        position_filter = filter_cols[1].selectbox("الموضع", [all_label] + POSITIONS, key="hist_position")
+        winner_filter = filter_cols[2].selectbox("الفائز", [all_label] + VEHICLES, key="hist_winner")
+        page_size = filter_cols[3].selectbox("عدد الصفوف", [25, 50, 100], key="hist_page_size")
+        filters = {
+            col: value
+            for col, value in (("Road", road_filter), ("Position", position_filter), ("Winner", winner_filter))
+            if value != all_label
+        }
         
-        st.dataframe(display_df[cols_to_show] if all(col in display_df.columns for col in cols_to_show) else display_df)
+        with timer("render_history"):
+            store = get_store()
+            total_rows = store.count(filters)
+            page_count = max((total_rows + page_size - 1) // page_size, 1)
+            if st.session_state.get("hist_page", 1) > page_count:
+                st.session_state.hist_page = page_count
+            page_number = st.number_input(f"الصفحة (من {page_count})", min_value=1, max_value=page_count, key="hist_page")
+            
+            page_rows = store.fetch_page(page_size, (page_number - 1) * page_size, filters)
+            for race in page_rows:
+                race['Hidden_Details'] = (
+                    f"{race['Hidden_Road_1']} ({race['Hidden_Road_1_Position']}) + "
+                    f"{race['Hidden_Road_2']} ({race['Hidden_Road_2_Position']})"
+                )
+            cols_to_show = ['Position', 'Road', 'Hidden_Details', 'Long_Road', 'Car1', 'Car2', 'Car3', 'Winner', 'Prediction']
+            import pandas as pd
+            st.dataframe(pd.DataFrame(page_rows, columns=cols_to_show), hide_index=True)
+            st.caption(f"{total_rows} سباق")
 
 elif page == "نسبة الربح":
     st.title("نسبة ربح التوقعات")
     
-    if not st.session_state.history or len(st.session_state.history) < 10:
-        st.warning(f"يجب أن يكون لديك 10 جولات على الأقل. لديك الآن: {len(st.session_state.history)}")
+    with timer("profit_page"):
+        summary = get_store().summary()
+    
+    if summary["total"] < 10:
+        st.warning(f"يجب أن يكون لديك 10 جولات على الأقل. لديك الآن: {summary['total']}")
     else:
-        hist_df = pd.DataFrame(st.session_state.history)
-        
-        total_races = len(hist_df)
-        correct_predictions = 0
+        total_races = summary["total"]
+        correct_predictions = summary["correct"]
         car_stats = {}
         for car in speed_data["Vehicle"]:
-            car_stats[car] = {"wins": 0, "correct_predictions": 0}
-        
-        for idx, row in hist_df.iterrows():
-            if 'Prediction' in row and 'Winner' in row:
-                if row['Prediction'] == row['Winner']:
-                    correct_predictions += 1
-                    car_stats[row['Winner']]['correct_predictions'] += 1
-                car_stats[row['Winner']]['wins'] += 1
+            car_stats[car] = summary["cars"].get(car, {"wins": 0, "correct_predictions": 0})
         
         overall_accuracy = (correct_predictions / total_races) * 100 if total_races > 0 else 0
         
@@ -459,6 +305,14 @@ elif page == "نسبة الربح":
         st.progress(overall_accuracy / 100)
         st.write(f"✅ التنبؤات الصحيحة: {correct_predictions}/{total_races}")
         
+        if summary["windows"]:
+            window_cols = st.columns(len(summary["windows"]))
+            for window_col, (size, accuracy) in zip(window_cols, summary["windows"].items()):
+                window_col.metric(f"آخر {size} جولة", f"{accuracy * 100:.1f}%")
+        if summary["trend"]:
+            st.caption("نسبة الربح المتحركة لآخر 100 جولة")
+            st.line_chart(summary["trend"])
+        
         st.markdown("---")
         st.subheader("نسبة نجاح توقع كل سيارة")
         
@@ -493,3 +347,38 @@ elif page == "نسبة الربح":
             "2. أكمل 50 جولة إضافية مع تحديد الطريق الأطول بدقة\\n"
             "3. الطريق الأطول قد يكون في أي موضع (L/C/R) — لا تفترض أنه دائمًا في L"
         )
+
+elif page == "المقاييس":
+    st.title("مقاييس الأداء")
+    st.caption("زمن كل مرحلة بالمللي ثانية (p50/p95/p99 من آخر القياسات)")
+    
+    @st.fragment(run_every=2)
+    def show_metrics():
+        snapshot = REGISTRY.snapshot()
+        if not snapshot:
+            st.info("لا توجد قياسات بعد")
+            return
+        import pandas as pd
+        metrics_df = pd.DataFrame.from_dict(snapshot, orient='index')
+        ms_columns = ['sum', 'mean', 'p50', 'p95', 'p99', 'max']
+        metrics_df[ms_columns] = metrics_df[ms_columns] * 1000
+        st.dataframe(metrics_df.round(3))
+
+        cache = history.cache_stats()
+        st.caption("ذاكرة التوقعات")
+        c1, c2, c3 = st.columns(3)
+        c1.metric("الحجم", f"{cache['size']} / {cache['maxsize']}")
+        c2.metric("إصابات / إخفاقات", f"{cache['hits']} / {cache['misses']}")
+        c3.metric("نسبة الإصابة", f"{cache['hit_rate'] * 100:.1f}%")
+    
+    show_metrics()
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button("JSON", data=REGISTRY.to_json(), file_name="metrics.json", mime="application/json")
+    with col2:
+        st.download_button("Prometheus", data=REGISTRY.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+    with col3:
+        if st.button("تصفير المقاييس"):
+            REGISTRY.reset()
+            st.rerun()
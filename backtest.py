@@ -0,0 +1,104 @@
+import argparse
+import json
+import time
+from collections import Counter
+
+from predictor import Predictor, SOURCE_HISTORICAL, SOURCE_COMBINED, SOURCE_TIME
+from race_codes import POSITIONS, ROADS, VEHICLES
+from storage import RaceStore
+from synthetic import synthetic_races
+
+DB_PATH = 'racing.db'
+
+
+def is_valid(race):
+    return (
+        race.get("Position") in POSITIONS
+        and race.get("Road") in ROADS
+        and all(race.get(col) in VEHICLES for col in ("Car1", "Car2", "Car3"))
+    )
+
+
+def run_backtest(races, model=None):
+    # إعادة تشغيل السباقات بالترتيب: كل توقع يرى السباقات السابقة فقط، ثم يُضاف السباق للحالة
+    # كل سباق يُبطل خليته مباشرة بعد توقعه، فلا فائدة من ذاكرة التوقعات هنا
+    predictor = Predictor(model=model, cache_size=0)
+    total = 0
+    correct = 0
+    skipped = 0
+    sources = Counter()
+    car_stats = {car: {"wins": 0, "correct_predictions": 0} for car in VEHICLES}
+
+    start = time.perf_counter()
+    for race in races:
+        if is_valid(race):
+            cars = [race["Car1"], race["Car2"], race["Car3"]]
+            result = predictor.predict(race["Position"], race["Road"], cars)
+            total += 1
+            sources[result["source"]] += 1
+            winner = race.get("Winner")
+            if winner in car_stats:
+                car_stats[winner]["wins"] += 1
+                if result["prediction"] == winner:
+                    correct += 1
+                    car_stats[winner]["correct_predictions"] += 1
+        else:
+            skipped += 1
+        predictor.add(race)
+    elapsed = time.perf_counter() - start
+
+    per_car = {}
+    for car, stats in car_stats.items():
+        if stats["wins"] > 0:
+            per_car[car] = dict(stats, accuracy=stats["correct_predictions"] / stats["wins"])
+
+    return {
+        "races": total,
+        "skipped": skipped,
+        "correct": correct,
+        "accuracy": correct / total if total else 0.0,
+        "per_car": per_car,
+        "method_share": {
+            source: sources[source] / total if total else 0.0
+            for source in (SOURCE_HISTORICAL, SOURCE_COMBINED, SOURCE_TIME)
+        },
+        "seconds": elapsed,
+        "predictions_per_second": total / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def _print_report(report):
+    print(f"Races: {report['races']} (skipped {report['skipped']})")
+    print(f"Accuracy: {report['accuracy'] * 100:.1f}% ({report['correct']}/{report['races']})")
+    for source, share in report["method_share"].items():
+        print(f"  {source}: {share * 100:.1f}%")
+    print("Per car:")
+    for car, stats in sorted(report["per_car"].items(), key=lambda x: -x[1]["accuracy"]):
+        print(f"  {car}: {stats['accuracy'] * 100:.1f}% ({stats['correct_predictions']}/{stats['wins']})")
+    print(f"{report['predictions_per_second']:.0f} predictions/s ({report['seconds']:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward backtest over the races history")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--synthetic", type=int, metavar="N", help="replay N synthetic races instead of the DB")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        races = synthetic_races(args.synthetic, args.seed)
+    else:
+        store = RaceStore(args.db)
+        races = store.load()
+        store.close()
+
+    report = run_backtest(races)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
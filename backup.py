@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from history_index import HIDDEN_COLUMNS
+from race_codes import (
+    CODED_COLUMNS, COLUMN_LABELS, METHOD_COLUMN, MISSING, POSITIONS, RACE_COLUMNS, ROADS, VEHICLES,
+    encode_value,
+)
+
+CHUNK_SIZE = 10000
+
+# أعمدة لا يُستعاد ملف Parquet بدونها؛ الاستعادة تستبدل السجل كله فلا تُملأ بقيم افتراضية
+PARQUET_REQUIRED_COLUMNS = [
+    "Position", "Road", "Hidden_Road_1", "Hidden_Road_1_Position", "Hidden_Road_2",
+    "Hidden_Road_2_Position", "Car1", "Car2", "Car3", "Winner",
+]
+
+# حجم مجموعة الصفوف في ملف Parquet
+PARQUET_BATCH = 50000
+PARQUET_COMPRESSION = "zstd"
+
+# القيم الافتراضية عند غياب العمود في الملف المرفوع
+CSV_DEFAULTS = {
+    "Position": "C",
+    "Road": "expressway",
+    "Hidden_Road_1": "dirt",
+    "Hidden_Road_1_Position": "C",
+    "Hidden_Road_2": "potholes",
+    "Hidden_Road_2_Position": "R",
+    "Long_Road": "المرئي",
+    "Car1": "Car",
+    "Car2": "Sport",
+    "Car3": "Super",
+    "Winner": "Car",
+    "Prediction_Method": "Restored",
+}
+
+# "dirt (C) + potholes (R)" -> dirt, C, potholes, R
+_HIDDEN_DETAILS_PATTERN = (
+    r'^\s*([^+(]*?)\s*\(\s*([^+()]*?)\s*\)?\s*\+\s*([^+(]*?)\s*\(\s*([^+()]*?)\s*\)?\s*$'
+)
+
+
+def parse_chunk(chunk):
+    # يعيد (السباقات الصالحة بأعمدة جدول races، عدد الصفوف المرفوضة)
+    chunk = chunk.drop(columns=['Unnamed: 0'], errors='ignore')
+    races = pd.DataFrame(index=chunk.index)
+    for col in RACE_COLUMNS:
+        if col in chunk.columns:
+            races[col] = chunk[col].str.strip()
+        elif col == "Prediction":
+            races[col] = races["Car1"]
+        else:
+            races[col] = CSV_DEFAULTS[col]
+
+    # ملفات التصدير القديمة تحفظ الطرق المخفية كنص واحد في Hidden_Details
+    if "Hidden_Road_1" not in chunk.columns and "Hidden_Details" in chunk.columns:
+        parts = chunk["Hidden_Details"].str.extract(_HIDDEN_DETAILS_PATTERN)
+        parsed = parts.notna().all(axis=1)
+        for i, col in enumerate(HIDDEN_COLUMNS):
+            races[col] = parts[i].where(parsed, CSV_DEFAULTS[col])
+
+    valid = (
+        races["Position"].isin(POSITIONS)
+        & races["Road"].isin(ROADS)
+        & races["Hidden_Road_1"].isin(ROADS)
+        & races["Hidden_Road_2"].isin(ROADS)
+        & races["Hidden_Road_1_Position"].isin(POSITIONS)
+        & races["Hidden_Road_2_Position"].isin(POSITIONS)
+        & races["Car1"].isin(VEHICLES)
+        & races["Car2"].isin(VEHICLES)
+        & races["Car3"].isin(VEHICLES)
+        & races["Winner"].isin(VEHICLES)
+        & (
+            (races["Winner"] == races["Car1"])
+            | (races["Winner"] == races["Car2"])
+            | (races["Winner"] == races["Car3"])
+        ).fillna(False)
+    )
+    return races[valid], int((~valid).sum())
+
+
+def _to_rows(races):
+    races = races.astype(object).where(races.notna(), None)
+    return list(races.itertuples(index=False, name=None))
+
+
+def import_csv(file, store, chunksize=CHUNK_SIZE, progress=None):
+    # قراءة الملف على دفعات وإدراج كل دفعة مباشرة، فلا يُحمَّل الملف كاملًا في الذاكرة
+    stats = {"imported": 0, "rejected": 0}
+
+    def chunks():
+        for chunk in pd.read_csv(file, chunksize=chunksize, dtype="string"):
+            races, rejected = parse_chunk(chunk)
+            stats["rejected"] += rejected
+            yield _to_rows(races)
+
+    stats["imported"] = store.replace_chunks(chunks(), progress)
+    return stats
+
+
+def _dictionary_column(codes, labels):
+    # الأكواد نفسها كفهارس لعمود dictionary؛ القيمة المفقودة null
+    indices = pa.array(codes.astype(np.int32), mask=codes == MISSING, type=pa.int32())
+    return pa.DictionaryArray.from_arrays(indices, pa.array(labels, type=pa.string()))
+
+
+def _parquet_schema(columns):
+    fields = [pa.field("id", pa.int64())]
+    fields += [pa.field(col, pa.dictionary(pa.int32(), pa.string())) for col in columns]
+    return pa.schema(fields)
+
+
+def export_parquet(store, sink, columns=None, min_id=None, max_id=None, batch_size=PARQUET_BATCH):
+    # كتابة السجل من SQLite إلى Parquet دفعةً دفعة دون بناء الجدول كاملًا في الذاكرة
+    columns = [col for col in RACE_COLUMNS if columns is None or col in columns]
+    method_labels = store.method_labels()
+    # الفجوات في أرقام prediction_methods لا تُشير إليها أي سباقات
+    methods = [method_labels.get(i, "") for i in range(max(method_labels, default=-1) + 1)]
+    total = 0
+    with pq.ParquetWriter(sink, _parquet_schema(columns), compression=PARQUET_COMPRESSION) as writer:
+        for ids, codes in store.iter_code_batches(columns, min_id, max_id, batch_size):
+            arrays = [pa.array(ids, type=pa.int64())]
+            for col in columns:
+                labels = methods if col == METHOD_COLUMN else COLUMN_LABELS[col]
+                arrays.append(_dictionary_column(codes[col], labels))
+            writer.write_batch(pa.record_batch(arrays, schema=writer.schema))
+            total += len(ids)
+    return total
+
+
+def _column_codes(array, col):
+    # عمود Arrow (dictionary أو نص) -> أكواد race_codes؛ القيم غير المعروفة والـ null تصبح MISSING
+    if not pa.types.is_dictionary(array.type):
+        array = pc.dictionary_encode(array.cast(pa.string()))
+    labels = pc.utf8_trim_whitespace(array.dictionary.cast(pa.string())).to_pylist()
+    remap = np.array([encode_value(col, label) for label in labels] + [MISSING], dtype=np.int64)
+    indices = array.indices.fill_null(len(labels)).to_numpy(zero_copy_only=False)
+    return remap[indices]
+
+
+def _method_labels(array):
+    if not pa.types.is_dictionary(array.type):
+        array = pc.dictionary_encode(array.cast(pa.string()))
+    labels = np.array(array.dictionary.cast(pa.string()).to_pylist() + [None], dtype=object)
+    return labels[array.indices.fill_null(len(labels) - 1).to_numpy(zero_copy_only=False)]
+
+
+def import_parquet(file, store, batch_size=PARQUET_BATCH, progress=None):
+    # يقرأ أعمدة جدول races فقط ويحوّلها إلى أكواد مباشرة دون المرور بالنصوص صفًا صفًا.
+    # الاستعادة تستبدل السجل كله، فلا تحديد لنطاق الأرقام هنا (التصدير وحده يقبله)
+    parquet = pq.ParquetFile(file)
+    names = set(parquet.schema_arrow.names)
+    missing = [col for col in PARQUET_REQUIRED_COLUMNS if col not in names]
+    if missing:
+        # قبل replace_chunks: لا يُحذف شيء من السجل الحالي
+        raise ValueError(f"ملف Parquet ينقصه أعمدة: {', '.join(missing)}")
+    columns = [col for col in RACE_COLUMNS if col in names]
+    stats = {"imported": 0, "rejected": 0}
+
+    def chunks():
+        for batch in parquet.iter_batches(batch_size=batch_size, columns=columns):
+            codes = {}
+            for col in CODED_COLUMNS:
+                if col in names:
+                    codes[col] = _column_codes(batch[col], col)
+                else:
+                    # الطريق الأطول والتوقع اختياريان: يُخزَّنان NULL بدل قيمة مختلَقة
+                    codes[col] = np.full(batch.num_rows, MISSING)
+            if METHOD_COLUMN in names:
+                methods = _method_labels(batch[METHOD_COLUMN])
+            else:
+                methods = np.full(batch.num_rows, CSV_DEFAULTS[METHOD_COLUMN], dtype=object)
+
+            # نفس شروط parse_chunk: كل الأعمدة المطلوبة صالحة، والفائز إحدى السيارات الثلاث
+            valid = np.ones(batch.num_rows, dtype=bool)
+            for col in PARQUET_REQUIRED_COLUMNS:
+                valid &= codes[col] != MISSING
+            valid &= (
+                (codes["Winner"] == codes["Car1"])
+                | (codes["Winner"] == codes["Car2"])
+                | (codes["Winner"] == codes["Car3"])
+            )
+            stats["rejected"] += int((~valid).sum())
+
+            block = np.stack([codes[col][valid] for col in CODED_COLUMNS], axis=1).astype(object)
+            block[block == MISSING] = None
+            yield [tuple(row) + (method,) for row, method in zip(block.tolist(), methods[valid])]
+
+    stats["imported"] = store.replace_chunks(chunks(), progress, encoded=True)
+    return stats
@@ -0,0 +1,161 @@
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from backup import export_parquet, import_csv, import_parquet
+from history_store import HistoryStore
+from storage import RaceStore
+from synthetic import synthetic_races, write_synthetic
+
+SIZES = [10000, 100000, 1000000]
+SAVES = 200
+PREDICTIONS = 20000
+SUMMARY_RUNS = 20
+PAGE_SIZE = 50
+
+# أعمدة جدول السجل كما يعرضها app.py
+_HISTORY_COLUMNS = ['Position', 'Road', 'Hidden_Details', 'Long_Road', 'Car1', 'Car2', 'Car3', 'Winner', 'Prediction']
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def _render_page(store, offset):
+    # نفس عمل صفحة السجل في app.py: العدد، صفحة واحدة، تنسيق Hidden_Details، ثم DataFrame
+    import pandas as pd
+
+    store.count()
+    rows = store.fetch_page(PAGE_SIZE, offset)
+    for race in rows:
+        race['Hidden_Details'] = (
+            f"{race['Hidden_Road_1']} ({race['Hidden_Road_1_Position']}) + "
+            f"{race['Hidden_Road_2']} ({race['Hidden_Road_2_Position']})"
+        )
+    return pd.DataFrame(rows, columns=_HISTORY_COLUMNS)
+
+
+def run_size(n, seed, tmp):
+    seconds = {}
+    report = {"races": n, "seconds": seconds}
+    db_path = os.path.join(tmp, f"bench_{n}.db")
+
+    store = RaceStore(db_path)
+    seconds["generate_write"], _ = _timed(write_synthetic, store, n, seed)
+    report["db_bytes"] = sum(os.path.getsize(p) for p in (db_path, db_path + "-wal") if os.path.exists(p))
+
+    seconds["load_history"], table = _timed(store.load)
+    history = HistoryStore(lambda: table, store.append)
+    seconds["build_predictor"], _ = _timed(history.start_loading().result)
+
+    # استعلامات وسباقات جديدة بمولد مستقل عن السجل
+    extra = synthetic_races(max(SAVES, PREDICTIONS), seed + 1)
+    queries = [(r["Position"], r["Road"], [r["Car1"], r["Car2"], r["Car3"]]) for r in extra[:PREDICTIONS]]
+    elapsed, _ = _timed(lambda: [history.predict(*q) for q in queries])
+    seconds["predict"] = elapsed / len(queries)
+    report["predict_cache_hit_rate"] = history.cache_stats()["hit_rate"]
+    elapsed, _ = _timed(history.predict_many, queries)
+    seconds["predict_many_per_race"] = elapsed / len(queries)
+
+    elapsed, _ = _timed(lambda: [history.append(race) for race in extra[:SAVES]])
+    seconds["save_history"] = elapsed / SAVES
+
+    elapsed, _ = _timed(lambda: [store.summary() for _ in range(SUMMARY_RUNS)])
+    seconds["profit_summary"] = elapsed / SUMMARY_RUNS
+
+    seconds["render_history_first_page"], _ = _timed(_render_page, store, 0)
+    seconds["render_history_last_page"], _ = _timed(_render_page, store, max(n - PAGE_SIZE, 0))
+
+    csv_buffer = io.StringIO()
+    seconds["csv_export"], _ = _timed(lambda: history.races.to_frame().to_csv(csv_buffer, index=False))
+    csv_data = csv_buffer.getvalue()
+    report["csv_bytes"] = len(csv_data.encode('utf-8'))
+    target = RaceStore(os.path.join(tmp, f"bench_{n}_csv.db"))
+    seconds["csv_import"], _ = _timed(import_csv, io.StringIO(csv_data), target)
+    target.close()
+
+    parquet_buffer = io.BytesIO()
+    seconds["parquet_export"], _ = _timed(export_parquet, store, parquet_buffer)
+    report["parquet_bytes"] = parquet_buffer.tell()
+    parquet_buffer.seek(0)
+    target = RaceStore(os.path.join(tmp, f"bench_{n}_parquet.db"))
+    seconds["parquet_import"], _ = _timed(import_parquet, parquet_buffer, target)
+    target.close()
+
+    store.close()
+    return report
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, seed=0):
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [run_size(n, seed, tmp) for n in sizes]
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold):
+    # نسبة الوقت الحالي إلى الأساس لكل مقياس وحجم؛ ما يتجاوز العتبة يُعلَّم
+    base = {r["races"]: r["seconds"] for r in baseline["results"]}
+    lines = []
+    for r in current["results"]:
+        old = base.get(r["races"])
+        if old is None:
+            continue
+        for metric, value in r["seconds"].items():
+            if old.get(metric):
+                ratio = value / old[metric]
+                flag = "  <-- slower" if ratio > threshold else ""
+                lines.append(f"{r['races']:>8}  {metric:<28} {ratio:6.2f}x{flag}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the storage and prediction paths at several history sizes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report to this file instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="print time ratios against an earlier JSON report")
+    parser.add_argument("--threshold", type=float, default=1.2, help="ratio above which --compare flags a metric")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.seed)
+    data = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(data + "\n")
+    elif not args.compare:
+        print(data)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print("\n".join(compare(baseline, report, args.threshold)))
+
+
+if __name__ == "__main__":
+    main()
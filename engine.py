@@ -0,0 +1,208 @@
+import numpy as np
+
+from metrics import timer
+from racing_config import (
+    speed_data, car_properties, weight_map, ROAD_PERCENTAGES,
+    LONG_ROAD_OPTIONS, ROUGH_ROADS, HANDLING_COEFFICIENT, POWER_EXPONENT,
+)
+from race_codes import VEHICLES, ROADS, POSITIONS
+
+VEHICLE_CODES = {name: i for i, name in enumerate(VEHICLES)}
+ROAD_CODES = {name: i for i, name in enumerate(ROADS)}
+# الموضع غير المعروف يأخذ الرمز 3 ووزنه 1.0 كما في weight_map.get(pos, 1.0)
+POSITION_CODES = {name: i for i, name in enumerate(POSITIONS)}
+UNKNOWN_POSITION = len(POSITIONS)
+# أي قيمة غير "المرئي" و"المخفي الأول" تُعامَل كالمخفي الثاني
+LONG_ROAD_CODES = {name: i for i, name in enumerate(LONG_ROAD_OPTIONS)}
+OTHER_LONG_ROAD_CODE = len(LONG_ROAD_OPTIONS) - 1
+
+
+def encode_positions(values):
+    return np.array([POSITION_CODES.get(v, UNKNOWN_POSITION) for v in values], dtype=np.int8)
+
+
+def encode_roads(values):
+    return np.array([ROAD_CODES[v] for v in values], dtype=np.int8)
+
+
+def encode_vehicles(values):
+    return np.array([VEHICLE_CODES[v] for v in values], dtype=np.int8)
+
+
+def encode_long_roads(values):
+    return np.array([LONG_ROAD_CODES.get(v, OTHER_LONG_ROAD_CODE) for v in values], dtype=np.int8)
+
+
+class TimeModel:
+    # نموذج الوقت بمصفوفات NumPy محسوبة مسبقًا: سرعة (طريق × مركبة)، أوزان المواضع، وخصائص السيارات
+    def __init__(self, speed_data=speed_data, car_properties=car_properties, weight_map=weight_map,
+                 road_percentages=ROAD_PERCENTAGES, rough_roads=ROUGH_ROADS,
+                 handling_coefficient=HANDLING_COEFFICIENT, power_exponent=POWER_EXPONENT,
+                 road_weights=None):
+        self.speeds = np.array([speed_data[road] for road in ROADS], dtype=np.float64)
+        self.position_weights = np.array(
+            [weight_map.get(pos, 1.0) for pos in POSITIONS] + [1.0], dtype=np.float64
+        )
+        self.handling = np.array([car_properties[v]["handling"] for v in VEHICLES], dtype=np.float64)
+        self.power = np.array([car_properties[v]["power"] for v in VEHICLES], dtype=np.float64)
+        self.rough = np.array([road in rough_roads for road in ROADS])
+
+        # نسبة كل مقطع (المرئي، المخفي 1، المخفي 2) حسب أي طريق هو الأطول
+        long_share = road_percentages["long_hidden"]
+        short_share = road_percentages["short_hidden"]
+        self.shares = np.array([
+            [long_share, short_share, short_share],
+            [short_share, long_share, short_share],
+            [short_share, short_share, long_share],
+        ], dtype=np.float64)
+
+        # معامل التعديل لكل (طريق مرئي × مركبة)
+        self.factors = np.where(
+            self.rough[:, None],
+            1.0 - self.handling[None, :] * handling_coefficient,
+            1.0 / self.power[None, :] ** power_exponent,
+        )
+
+        # أوزان اختيارية لكل مقطع حسب الطريق المرئي (مثل road_weights_config)؛ غير مستخدمة افتراضيًا
+        self.segment_weights = None
+        if road_weights is not None:
+            self.segment_weights = np.array(
+                [[road_weights[road][seg] for seg in ("visible", "hidden1", "hidden2")] for road in ROADS],
+                dtype=np.float64,
+            )
+
+    def race_times(self, position, road, hidden1, hidden1_pos, hidden2, hidden2_pos, long_road, cars):
+        # كل المدخلات مصفوفات رموز بطول n، و cars بشكل (n, 3)؛ الناتج أوقات بشكل (n, 3)
+        cars = np.asarray(cars, dtype=np.intp)
+        seg_roads = np.stack([road, hidden1, hidden2], axis=1).astype(np.intp)
+        seg_weights = self.position_weights[np.stack([position, hidden1_pos, hidden2_pos], axis=1)]
+        speeds = self.speeds[seg_roads[:, :, None], cars[:, None, :]] * seg_weights[:, :, None]
+        segment_times = self.shares[np.asarray(long_road, dtype=np.intp)][:, :, None] / speeds
+        if self.segment_weights is not None:
+            segment_times = segment_times * self.segment_weights[seg_roads[:, 0]][:, :, None]
+        total = segment_times[:, 0] + segment_times[:, 1] + segment_times[:, 2]
+        return total * self.factors[np.asarray(road, dtype=np.intp)[:, None], cars]
+
+    def predict_codes(self, position, road, hidden1, hidden1_pos, hidden2, hidden2_pos, long_road, cars):
+        # أول سيارة بأقل وقت، كما في combined_times.index(min(...))
+        times = self.race_times(position, road, hidden1, hidden1_pos, hidden2, hidden2_pos, long_road, cars)
+        winner_slot = times.argmin(axis=1)
+        return np.asarray(cars)[np.arange(len(winner_slot)), winner_slot]
+
+    def predict_batch(self, races):
+        # races: قائمة قواميس أو DataFrame/قاموس أعمدة بنفس أسماء أعمدة جدول races
+        if isinstance(races, list):
+            races = {col: [r[col] for r in races] for col in _BATCH_COLUMNS}
+        winners = self.predict_codes(
+            encode_positions(races["Position"]),
+            encode_roads(races["Road"]),
+            encode_roads(races["Hidden_Road_1"]),
+            encode_positions(races["Hidden_Road_1_Position"]),
+            encode_roads(races["Hidden_Road_2"]),
+            encode_positions(races["Hidden_Road_2_Position"]),
+            encode_long_roads(races["Long_Road"]),
+            np.stack([encode_vehicles(races[col]) for col in ("Car1", "Car2", "Car3")], axis=1),
+        )
+        return [VEHICLES[i] for i in winners]
+
+    def predict_one(self, position, road, hidden_roads, hidden_positions, long_road, cars):
+        return self.predict_batch([{
+            "Position": position,
+            "Road": road,
+            "Hidden_Road_1": hidden_roads[0],
+            "Hidden_Road_1_Position": hidden_positions[0],
+            "Hidden_Road_2": hidden_roads[1],
+            "Hidden_Road_2_Position": hidden_positions[1],
+            "Long_Road": long_road,
+            "Car1": cars[0],
+            "Car2": cars[1],
+            "Car3": cars[2],
+        }])[0]
+
+
+def encode_scenarios(scenarios):
+    # scenarios: قائمة (طريق 1، موضعه، طريق 2، موضعه، الطريق الأطول) -> مصفوفة رموز (K, 5)
+    columns = list(zip(*scenarios))
+    return np.stack([
+        encode_roads(columns[0]),
+        encode_positions(columns[1]),
+        encode_roads(columns[2]),
+        encode_positions(columns[3]),
+        encode_long_roads(columns[4]),
+    ], axis=1)
+
+
+def scenario_win_probabilities(model, position, road, cars, scenario_codes, weights, samples=None, rng=None):
+    # يُقيَّم كل سيناريو مميز مرة واحدة، ثم تُسحب samples عينة (متعددة الحدود) بحسب أوزانها
+    k = len(scenario_codes)
+    car_codes = np.tile(encode_vehicles(cars), (k, 1))
+    times = model.race_times(
+        np.repeat(encode_positions([position]), k),
+        np.repeat(encode_roads([road]), k),
+        scenario_codes[:, 0], scenario_codes[:, 1],
+        scenario_codes[:, 2], scenario_codes[:, 3],
+        scenario_codes[:, 4],
+        car_codes,
+    )
+    winner_slot = times.argmin(axis=1)
+    probs = np.asarray(weights, dtype=np.float64)
+    probs = probs / probs.sum()
+    if samples:
+        rng = rng if rng is not None else np.random.default_rng()
+        probs = rng.multinomial(samples, probs) / samples
+    slot_probs = np.bincount(winner_slot, weights=probs, minlength=3)
+    result = {}
+    for car, p in zip(cars, slot_probs):
+        result[car] = result.get(car, 0.0) + float(p)
+    return result
+
+
+class PredictionTable:
+    # جدول توقعات نموذج الوقت لكل (موضع × طريق × ثلاثية سيارات)، 3×6×9³ رمز int8
+    def __init__(self, model=None):
+        self.model = model or DEFAULT_MODEL
+        n = len(VEHICLES)
+        self.winners = np.zeros((len(POSITIONS), len(ROADS), n, n, n), dtype=np.int8)
+        self.cell_inputs = {}
+
+    def update_cell(self, position, road, hidden_roads, hidden_positions, long_road):
+        # يُعاد حساب الخلية فقط إذا تغيرت الطرق المخفية أو الطريق الأطول المستنتجة لها
+        inputs = (tuple(hidden_roads), tuple(hidden_positions), long_road)
+        if self.cell_inputs.get((position, road)) == inputs:
+            return False
+        with timer("physics_model"):
+            self._compute_cell(position, road, hidden_roads, hidden_positions, long_road)
+        self.cell_inputs[(position, road)] = inputs
+        return True
+
+    def _compute_cell(self, position, road, hidden_roads, hidden_positions, long_road):
+        n = len(_ALL_TRIPLES)
+        scalars = (
+            encode_positions([position]), encode_roads([road]),
+            encode_roads([hidden_roads[0]]), encode_positions([hidden_positions[0]]),
+            encode_roads([hidden_roads[1]]), encode_positions([hidden_positions[1]]),
+            encode_long_roads([long_road]),
+        )
+        codes = self.model.predict_codes(*(np.repeat(s, n) for s in scalars), _ALL_TRIPLES)
+        self.winners[POSITION_CODES[position], ROAD_CODES[road]] = codes.reshape(self.winners.shape[2:])
+
+    def lookup(self, position, road, cars):
+        code = self.winners[
+            POSITION_CODES[position], ROAD_CODES[road],
+            VEHICLE_CODES[cars[0]], VEHICLE_CODES[cars[1]], VEHICLE_CODES[cars[2]],
+        ]
+        return VEHICLES[code]
+
+
+_ALL_TRIPLES = np.indices((len(VEHICLES),) * 3).reshape(3, -1).T
+
+_BATCH_COLUMNS = [
+    "Position", "Road", "Hidden_Road_1", "Hidden_Road_1_Position", "Hidden_Road_2",
+    "Hidden_Road_2_Position", "Long_Road", "Car1", "Car2", "Car3",
+]
+
+DEFAULT_MODEL = TimeModel()
+
+
+def predict_batch(races):
+    return DEFAULT_MODEL.predict_batch(races)
@@ -0,0 +1,86 @@
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+HIDDEN_COLUMNS = ["Hidden_Road_1", "Hidden_Road_1_Position", "Hidden_Road_2", "Hidden_Road_2_Position"]
+CAR_COLUMNS = ["Car1", "Car2", "Car3"]
+
+
+def _present(value):
+    # None و NaN (من ملفات CSV) لا تدخل في حساب المنوال
+    return value is not None and value == value
+
+
+@lru_cache(maxsize=1024)
+def _car_subsets(cars):
+    items = list(dict.fromkeys(cars))
+    return tuple(
+        frozenset(items[i] for i in range(len(items)) if mask & (1 << i))
+        for mask in range(1, 1 << len(items))
+    )
+
+
+class _RunningMode:
+    # منوال يُحدَّث عند كل إضافة؛ عند التعادل يُختار الأصغر كما يفعل pandas mode()
+    __slots__ = ("counts", "best", "best_key", "best_count")
+
+    def __init__(self):
+        self.counts = Counter()
+        self.best = None
+        self.best_key = None
+        self.best_count = 0
+
+    def add(self, value, sort_key):
+        self.counts[value] += 1
+        count = self.counts[value]
+        if count > self.best_count or (count == self.best_count and sort_key < self.best_key):
+            self.best, self.best_key, self.best_count = value, sort_key, count
+
+
+class HistoryIndex:
+    # فهرس في الذاكرة لمسار التنبؤ التاريخي، يُحدَّث بتكلفة ثابتة عند إضافة كل سباق
+    def __init__(self, races=()):
+        self.total = 0
+        self.hidden_pairs = defaultdict(_RunningMode)  # (Position, Road)
+        self.long_roads = defaultdict(_RunningMode)  # (Position, Road)
+        self.winners = defaultdict(Counter)  # (Position, Road, مجموعة السيارات)
+        self.scenarios = defaultdict(Counter)  # (Position, Road) -> (الطرق المخفية ومواضعها، الطريق الأطول)
+        for race in races:
+            self.add(race)
+
+    def add(self, race):
+        self.total += 1
+        key = (race.get("Position"), race.get("Road"))
+
+        pair = tuple(race.get(col) for col in HIDDEN_COLUMNS)
+        long_road = race.get("Long_Road")
+        if all(_present(v) for v in pair):
+            self.hidden_pairs[key].add(pair, ','.join(str(v) for v in pair))
+            self.scenarios[key][pair + (long_road if _present(long_road) else None,)] += 1
+
+        if _present(long_road):
+            self.long_roads[key].add(long_road, str(long_road))
+
+        car_set = frozenset(race.get(col) for col in CAR_COLUMNS)
+        self.winners[key + (car_set,)][race.get("Winner")] += 1
+
+    def hidden_mode(self, position, road):
+        # يعيد (الطريق 1، موضعه، الطريق 2، موضعه) أو None
+        mode = self.hidden_pairs.get((position, road))
+        return mode.best if mode else None
+
+    def long_road_mode(self, position, road):
+        mode = self.long_roads.get((position, road))
+        return mode.best if mode else None
+
+    def win_counts(self, position, road, cars):
+        # السباقات المشابهة: كل سيارات السباق السابق من ضمن السيارات الحالية
+        counts = {car: 0 for car in cars}
+        matched = 0
+        for car_set in _car_subsets(tuple(cars)):
+            winners = self.winners.get((position, road, car_set))
+            if not winners:
+                continue
+            matched += sum(winners.values())
+            for car in counts:
+                counts[car] += winners[car]
+        return matched, counts
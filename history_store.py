@@ -0,0 +1,131 @@
+import threading
+from concurrent.futures import Future
+
+from predictor import Predictor
+
+
+class HistoryStore:
+    # سجل واحد مشترك لكل الجلسات في العملية، يُحمَّل عند أول استخدام ويزيد رقم النسخة مع كل كتابة
+    def __init__(self, load, save, stored_count=None):
+        self._load = load
+        self._save = save
+        # عدد السباقات في التخزين دون تحميلها؛ صفر يعني أن توقع الفيزياء هو التوقع النهائي
+        self._stored_count = stored_count
+        self._lock = threading.RLock()
+        self._races = None
+        self._predictor = None
+        self._loading = None
+        # توقعات الفيزياء وحدها (سجل فارغ) ريثما يكتمل التحميل؛ جدولها يُحسب في أجزاء من الثانية
+        self._provisional = Predictor(())
+        self.version = 0
+
+    def _load_into(self, future):
+        try:
+            races = self._load()
+            predictor = Predictor(races)
+        except BaseException as e:
+            future.set_exception(e)
+            return
+        with self._lock:
+            if self._loading is future:
+                self._races, self._predictor = races, predictor
+        future.set_result(None)
+
+    def start_loading(self):
+        # تحميل السجل في خيط خلفي دون انتظار؛ يعيد Future ينتهي عند اكتمال التحميل
+        with self._lock:
+            if self._loading is None:
+                self._loading = Future()
+                threading.Thread(target=self._load_into, args=(self._loading,), daemon=True).start()
+            return self._loading
+
+    def _ensure_loaded(self):
+        # حلقة لأن reload أثناء التحميل يُلغي نتيجة التحميل الجاري ويبدأ غيره
+        while self._races is None:
+            future = self.start_loading()
+            try:
+                future.result()
+            except BaseException:
+                # فشل التحميل: المحاولة التالية تبدأ من جديد، إلا إذا أكمل reload التحميل في الأثناء
+                with self._lock:
+                    if self._loading is future:
+                        self._loading = None
+                    if self._races is not None:
+                        return
+                raise
+
+    @property
+    def races(self):
+        # قائمة مشتركة للقراءة فقط؛ لا تُنسخ لكل جلسة
+        self._ensure_loaded()
+        return self._races
+
+    @property
+    def predictor(self):
+        self._ensure_loaded()
+        return self._predictor
+
+    def count(self):
+        # ليست __len__: streamlit يستدعي len() على ناتج cache_resource لجمع مقاييسه، فيفرض التحميل
+        return len(self.races)
+
+    def predict(self, position, road, cars, wait=False):
+        # قبل اكتمال التحميل: توقع الوقت من جدول الفيزياء، مع provisional=True؛
+        # wait=True ينتظر السجل الكامل (للتوقع الذي يُحفظ مع السباق)
+        if wait:
+            self._ensure_loaded()
+        if self._races is None:
+            self.start_loading()
+            with self._lock:
+                if self._races is None:
+                    result = self._provisional.predict(position, road, cars)
+                    pending = self._stored_count() if self._stored_count is not None else None
+                    if pending != 0:
+                        result = dict(result, provisional=True)
+                    return result
+        with self._lock:
+            return self._predictor.predict(position, road, cars)
+
+    def win_probabilities(self, position, road, cars):
+        self._ensure_loaded()
+        with self._lock:
+            return self._predictor.win_probabilities(position, road, cars)
+
+    def predict_many(self, queries):
+        # queries: (position, road, cars) لكل سباق؛ قفل واحد للدفعة كلها
+        self._ensure_loaded()
+        with self._lock:
+            return [self._predictor.predict(position, road, cars) for position, road, cars in queries]
+
+    def cache_stats(self):
+        with self._lock:
+            return (self._predictor or self._provisional).cache.stats()
+
+    def append(self, race):
+        self._ensure_loaded()
+        with self._lock:
+            if not self._save([race]):
+                return False
+            self._races.append(race)
+            self._predictor.add(race)
+            self.version += 1
+            return True
+
+    def reload(self):
+        # بعد استبدال السجل من ملف: التحميل خارج القفل ثم تبديل (races, predictor) معًا،
+        # فلا ترى الجلسات الأخرى سجلًا فارغًا أثناء التحميل
+        with self._lock:
+            version = self.version
+        races = self._load()
+        predictor = Predictor(races)
+        with self._lock:
+            if self.version != version:
+                # حُفظ سباق أثناء التحميل: إعادة التحميل تحت القفل حتى لا يضيع
+                races = self._load()
+                predictor = Predictor(races)
+            done = Future()
+            done.set_result(None)
+            # أي تحميل أولي جارٍ تُهمل نتيجته لأن _loading لم يعد يشير إليه
+            self._loading = done
+            self._races, self._predictor = races, predictor
+            self.version += 1
@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from race_codes import POSITIONS, ROADS, VEHICLES
+
+
+def random_batch(rng, size):
+    return [
+        {
+            "Position": rng.choice(POSITIONS),
+            "Road": rng.choice(ROADS),
+            "Car1": rng.choice(VEHICLES),
+            "Car2": rng.choice(VEHICLES),
+            "Car3": rng.choice(VEHICLES),
+        }
+        for _ in range(size)
+    ]
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+
+async def _worker(host, port, requests, deadline, latencies, errors):
+    # اتصال keep-alive واحد لكل عامل يرسل الطلبات المجهزة مسبقًا بالتتابع
+    reader, writer = await asyncio.open_connection(host, port)
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(requests[i % len(requests)])
+            await writer.drain()
+            status = await _read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+            i += 1
+    finally:
+        writer.close()
+
+
+async def run(host, port, concurrency, batch_size, duration, seed):
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(64):
+        body = json.dumps({"races": random_batch(rng, batch_size)}).encode('utf-8')
+        requests.append(
+            f"POST /predict HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+        )
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        _worker(host, port, requests, deadline, latencies, errors) for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def pct(q):
+        return latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000 if latencies else 0.0
+
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed,
+        "predictions_per_second": len(latencies) * batch_size / elapsed,
+        "latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99)},
+        "concurrency": concurrency,
+        "batch_size": batch_size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for service.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch", type=int, default=100, help="races per request")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.host, args.port, args.concurrency, args.batch, args.duration, args.seed))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
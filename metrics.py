@@ -0,0 +1,113 @@
+import bisect
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+# حدود فئات المدرج التكراري بالثواني (بصيغة Prometheus)
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# عدد آخر القياسات المحفوظة لحساب p50/p95/p99
+RECENT_SAMPLES = 2048
+
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+
+class StageTimings:
+    __slots__ = ("count", "total", "max", "buckets", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.recent.append(seconds)
+
+    def summary(self):
+        recent = sorted(self.recent)
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": _quantile(recent, 0.50),
+            "p95": _quantile(recent, 0.95),
+            "p99": _quantile(recent, 0.99),
+            "max": self.max,
+        }
+
+
+class MetricsRegistry:
+    # سجل توقيتات داخل العملية لكل مرحلة من مراحل إعادة التشغيل
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            timings = self._stages.get(stage)
+            if timings is None:
+                timings = self._stages[stage] = StageTimings()
+            timings.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def timed(self, stage):
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: timings.summary() for stage, timings in sorted(self._stages.items())}
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, name="racing_stage_seconds"):
+        lines = [
+            f"# HELP {name} Time spent in each app stage.",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            stages = [(stage, list(t.buckets), t.count, t.total) for stage, t in sorted(self._stages.items())]
+        for stage, buckets, count, total in stages:
+            cumulative = 0
+            for bound, n in zip(BUCKETS, buckets):
+                cumulative += n
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+timer = REGISTRY.timer
+timed = REGISTRY.timed
@@ -0,0 +1,182 @@
+from collections import Counter, OrderedDict
+
+from engine import PredictionTable, encode_scenarios, scenario_win_probabilities
+from history_index import HistoryIndex
+from race_codes import POSITIONS, ROADS
+from racing_config import hidden_roads_map
+
+# لا يُستخدم السجل قبل تجاوز هذا العدد من السباقات
+HISTORY_THRESHOLD = 20
+
+# أقصى عدد من التوقعات المحفوظة في ذاكرة LRU
+PREDICTION_CACHE_SIZE = 1024
+
+DEFAULT_HIDDEN_ROADS = ["dirt", "potholes"]
+DEFAULT_HIDDEN_POSITIONS = ["C", "C"]
+DEFAULT_LONG_ROAD = "المرئي"
+
+HISTORICAL_METHOD = "التاريخي (دقة عالية)"
+
+# مصدر التوقع: من السجل، أو نموذج الوقت بعد تجاوز العتبة (المدمج)، أو نموذج الوقت فقط
+SOURCE_HISTORICAL = "historical"
+SOURCE_COMBINED = "combined"
+SOURCE_TIME = "time"
+
+
+def infer_layout(index, position, road):
+    # الطرق المخفية ومواضعها والطريق الأطول: المنوال من السجل، وإلا القيم الافتراضية
+    hidden_roads = list(hidden_roads_map.get(road, DEFAULT_HIDDEN_ROADS))
+    hidden_positions = list(DEFAULT_HIDDEN_POSITIONS)
+    long_road = DEFAULT_LONG_ROAD
+    if index.total > HISTORY_THRESHOLD:
+        hidden_mode = index.hidden_mode(position, road)
+        if hidden_mode is not None:
+            hidden_roads = [hidden_mode[0], hidden_mode[2]]
+            hidden_positions = [hidden_mode[1], hidden_mode[3]]
+        long_road_mode = index.long_road_mode(position, road)
+        if long_road_mode is not None:
+            long_road = long_road_mode
+    return hidden_roads, hidden_positions, long_road
+
+
+def historical_prediction(index, position, road, cars):
+    # الفائز الأكثر تكرارًا في سباقات السجل المطابقة، أو None إذا لا يوجد سباق مطابق
+    matched, win_counts = index.win_counts(position, road, cars)
+    return max(win_counts, key=win_counts.get) if matched >= 1 else None
+
+
+class PredictionCache:
+    # ذاكرة LRU محدودة للتوقعات؛ كل مدخل يحمل رقم نسخة خليته ويُعد قديمًا إذا تغيرت
+    def __init__(self, maxsize=PREDICTION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, version):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, key, version, value):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (version, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class Predictor:
+    # فهرس السجل + جدول توقعات نموذج الوقت، ويُحدَّث الجدول فقط للخلايا التي تغيرت إحصاءاتها
+    def __init__(self, races=(), model=None, cache_size=PREDICTION_CACHE_SIZE):
+        self.index = HistoryIndex(races)
+        self.table = PredictionTable(model)
+        self.cache = PredictionCache(cache_size)
+        self._scenario_tables = {}
+        # نسخة لكل (Position, Road) تزيد مع كل سباق جديد فيها، ونسخة عامة تزيد عند تجاوز العتبة
+        self._cell_versions = {}
+        self._epoch = 0
+        self.sync()
+
+    def sync(self):
+        for position in POSITIONS:
+            for road in ROADS:
+                self.sync_cell(position, road)
+
+    def sync_cell(self, position, road):
+        if position not in POSITIONS or road not in ROADS:
+            return False
+        return self.table.update_cell(position, road, *infer_layout(self.index, position, road))
+
+    def add(self, race):
+        self.index.add(race)
+        key = (race.get("Position"), race.get("Road"))
+        self._cell_versions[key] = self._cell_versions.get(key, 0) + 1
+        if self.index.total == HISTORY_THRESHOLD + 1:
+            # تجاوز العتبة يغيّر مدخلات كل الخلايا
+            self._epoch += 1
+            self.cache.clear()
+            self._scenario_tables.clear()
+            self.sync()
+        else:
+            self._scenario_tables.pop(key, None)
+            self.sync_cell(*key)
+
+    def scenario_table(self, position, road):
+        # التوزيع التجريبي للسيناريوهات في الخلية (رموز مميزة + أوزان)، يُبنى مرة ويُلغى عند سباق جديد فيها
+        key = (position, road)
+        table = self._scenario_tables.get(key)
+        if table is None:
+            counts = self.index.scenarios.get(key) if self.index.total > HISTORY_THRESHOLD else None
+            hidden_roads, hidden_positions, long_road = infer_layout(self.index, position, road)
+            if counts:
+                # السباق بلا طريق أطول يأخذ ما يفترضه التنبؤ للخلية (المنوال، وإلا المرئي)
+                merged = Counter()
+                for scenario, n in counts.items():
+                    merged[scenario[:4] + (long_road if scenario[4] is None else scenario[4],)] += n
+                scenarios, weights = list(merged), list(merged.values())
+            else:
+                # بدون سجل: السيناريو الافتراضي نفسه المستخدم في التنبؤ
+                scenarios = [(hidden_roads[0], hidden_positions[0], hidden_roads[1], hidden_positions[1], long_road)]
+                weights = [1]
+            table = self._scenario_tables[key] = (encode_scenarios(scenarios), weights)
+        return table
+
+    def win_probabilities(self, position, road, cars, samples=None, rng=None):
+        # بأوزان السيناريوهات الدقيقة افتراضيًا، فلا تتغير النسب بين إعادة عرض وأخرى لنفس الخلية
+        scenario_codes, weights = self.scenario_table(position, road)
+        return scenario_win_probabilities(
+            self.table.model, position, road, cars, scenario_codes, weights, samples, rng
+        )
+
+    def predict(self, position, road, cars):
+        key = (position, road, tuple(cars))
+        version = (self._epoch, self._cell_versions.get((position, road), 0))
+        result = self.cache.get(key, version)
+        if result is None:
+            result = self._compute(position, road, cars)
+            self.cache.put(key, version, result)
+        return dict(result)
+
+    def _compute(self, position, road, cars):
+        hidden_roads, hidden_positions, long_road = self.table.cell_inputs[(position, road)]
+        prediction = None
+        if self.index.total > HISTORY_THRESHOLD:
+            prediction = historical_prediction(self.index, position, road, cars)
+            if prediction is not None:
+                method = HISTORICAL_METHOD
+                source = SOURCE_HISTORICAL
+            else:
+                method = f"المدمج (الطريق الأطول: {long_road})"
+                source = SOURCE_COMBINED
+        else:
+            method = f"الوقت (الطريق الأطول: {long_road})"
+            source = SOURCE_TIME
+        if prediction is None:
+            prediction = self.table.lookup(position, road, cars)
+        return {
+            "prediction": prediction,
+            "method": method,
+            "source": source,
+            "hidden_roads": list(hidden_roads),
+            "hidden_positions": list(hidden_positions),
+            "long_road": long_road,
+        }
@@ -0,0 +1,46 @@
+from racing_config import speed_data, hidden_roads_map, LONG_ROAD_OPTIONS
+
+# --- جداول الترميز: كل قيمة نصية تُخزَّن كرقم صغير (موقعها في القائمة) ---
+VEHICLES = speed_data["Vehicle"]
+ROADS = [road for road in speed_data if road != "Vehicle"]
+POSITIONS = ["L", "C", "R"]
+
+assert set(hidden_roads_map) == set(ROADS)
+
+# القيمة المفقودة (NULL في قاعدة البيانات)
+MISSING = -1
+
+COLUMN_LABELS = {
+    "Position": POSITIONS,
+    "Road": ROADS,
+    "Hidden_Road_1": ROADS,
+    "Hidden_Road_1_Position": POSITIONS,
+    "Hidden_Road_2": ROADS,
+    "Hidden_Road_2_Position": POSITIONS,
+    "Long_Road": LONG_ROAD_OPTIONS,
+    "Car1": VEHICLES,
+    "Car2": VEHICLES,
+    "Car3": VEHICLES,
+    "Winner": VEHICLES,
+    "Prediction": VEHICLES,
+}
+CODED_COLUMNS = list(COLUMN_LABELS)
+
+# Prediction_Method نص حر، يُرمَّز بجدول قاموس يكبر مع القيم الجديدة
+METHOD_COLUMN = "Prediction_Method"
+
+# أعمدة جدول السباقات بالترتيب المخزن
+RACE_COLUMNS = CODED_COLUMNS + [METHOD_COLUMN]
+
+COLUMN_CODES = {
+    col: {label: code for code, label in enumerate(labels)}
+    for col, labels in COLUMN_LABELS.items()
+}
+
+
+def encode_value(col, value):
+    return COLUMN_CODES[col].get(value, MISSING)
+
+
+def decode_value(col, code):
+    return COLUMN_LABELS[col][code] if code != MISSING else None
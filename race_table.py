@@ -0,0 +1,86 @@
+import numpy as np
+
+from race_codes import CODED_COLUMNS, COLUMN_LABELS, METHOD_COLUMN, MISSING, RACE_COLUMNS, encode_value
+
+
+class RaceTable:
+    # السجل في الذاكرة كأعمدة أرقام (int8، و int32 لطريقة التوقع) بدل قائمة قواميس نصية
+    def __init__(self, capacity=1024):
+        self._size = 0
+        self._codes = {col: np.full(capacity, MISSING, dtype=np.int8) for col in CODED_COLUMNS}
+        self._codes[METHOD_COLUMN] = np.full(capacity, MISSING, dtype=np.int32)
+        self.method_labels = []
+        self._method_codes = {}
+
+    @classmethod
+    def from_races(cls, races):
+        table = cls()
+        for race in races:
+            table.append(race)
+        return table
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, extra):
+        capacity = len(self._codes[METHOD_COLUMN])
+        needed = self._size + extra
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2)
+        for col, old in self._codes.items():
+            new = np.full(capacity, MISSING, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            self._codes[col] = new
+
+    def method_code(self, label):
+        if label is None or label != label:
+            return MISSING
+        code = self._method_codes.get(label)
+        if code is None:
+            code = len(self.method_labels)
+            self.method_labels.append(label)
+            self._method_codes[label] = code
+        return code
+
+    def append(self, race):
+        self._reserve(1)
+        i = self._size
+        for col in CODED_COLUMNS:
+            self._codes[col][i] = encode_value(col, race.get(col))
+        self._codes[METHOD_COLUMN][i] = self.method_code(race.get(METHOD_COLUMN))
+        self._size += 1
+
+    def extend_codes(self, columns, method_labels):
+        # columns: رموز لكل عمود؛ رموز Prediction_Method مواقع في method_labels
+        n = len(columns[METHOD_COLUMN])
+        self._reserve(n)
+        start, stop = self._size, self._size + n
+        for col in CODED_COLUMNS:
+            self._codes[col][start:stop] = columns[col]
+        remap = np.array([self.method_code(label) for label in method_labels] + [MISSING], dtype=np.int32)
+        self._codes[METHOD_COLUMN][start:stop] = remap[columns[METHOD_COLUMN]]
+        self._size = stop
+
+    def codes(self, col):
+        return self._codes[col][:self._size]
+
+    def labels(self, col):
+        return self.method_labels if col == METHOD_COLUMN else COLUMN_LABELS[col]
+
+    def to_frame(self, columns=RACE_COLUMNS, start=0, stop=None, categorical=True):
+        # pandas يُستورد عند الحاجة فقط: تحميل السجل والتوقع لا يحتاجانه
+        import pandas as pd
+
+        data = {}
+        for col in columns:
+            values = pd.Categorical.from_codes(self.codes(col)[start:stop], categories=self.labels(col))
+            data[col] = values if categorical else np.asarray(values, dtype=object)
+        return pd.DataFrame(data)
+
+    def __iter__(self):
+        # فك الترميز إلى قواميس؛ الرمز -1 يقابل آخر عنصر (None) في كل قائمة
+        decoders = [list(self.labels(col)) + [None] for col in RACE_COLUMNS]
+        columns = [self.codes(col).tolist() for col in RACE_COLUMNS]
+        for row in zip(*columns):
+            yield {col: labels[code] for col, labels, code in zip(RACE_COLUMNS, decoders, row)}
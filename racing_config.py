@@ -0,0 +1,55 @@
+# --- إعدادات السرعة والخرائط ---
+speed_data = {
+    "Vehicle": ["Car", "Sport", "Super", "Bigbike", "Moto", "ORV", "SUV", "Truck", "ATV"],
+    "expressway": [264, 432, 480, 264, 220.8, 286, 348, 240, 115.2],
+    "highway": [290.4, 480, 528, 230.4, 225.6, 240, 360, 276, 115.2],
+    "dirt": [153.6, 360, 264, 165.6, 144, 220.8, 336, 87.6, 187.2],
+    "potholes": [67.2, 57.6, 52.8, 187.2, 96, 134.4, 110.4, 108, 144],
+    "bumpy": [98.4, 168, 151.2, 259.2, 108, 218.4, 213.6, 216, 187.2],
+    "desert": [132, 96, 62.4, 132, 72, 58.08, 139.2, 98.28, 168]
+}
+
+hidden_roads_map = {
+    "expressway": ["highway", "bumpy"],
+    "highway": ["expressway", "dirt"],
+    "dirt": ["potholes", "desert"],
+    "potholes": ["dirt", "bumpy"],
+    "bumpy": ["highway", "potholes"],
+    "desert": ["dirt", "potholes"]
+}
+
+road_weights_config = {
+    "expressway": {"visible": 0.5, "hidden1": 0.25, "hidden2": 0.25},
+    "highway": {"visible": 0.5, "hidden1": 0.25, "hidden2": 0.25},
+    "dirt": {"visible": 0.3, "hidden1": 0.35, "hidden2": 0.35},
+    "potholes": {"visible": 0.3, "hidden1": 0.35, "hidden2": 0.35},
+    "bumpy": {"visible": 0.4, "hidden1": 0.3, "hidden2": 0.3},
+    "desert": {"visible": 0.2, "hidden1": 0.4, "hidden2": 0.4}
+}
+
+car_properties = {
+    "Car": {"weight": 1.0, "power": 1.0, "handling": 1.0},
+    "Sport": {"weight": 0.8, "power": 1.3, "handling": 1.2},
+    "Super": {"weight": 0.7, "power": 1.5, "handling": 1.4},
+    "Bigbike": {"weight": 0.6, "power": 1.2, "handling": 0.9},
+    "Moto": {"weight": 0.5, "power": 1.0, "handling": 0.8},
+    "ORV": {"weight": 1.3, "power": 1.1, "handling": 1.5},
+    "SUV": {"weight": 1.2, "power": 1.2, "handling": 1.3},
+    "Truck": {"weight": 1.5, "power": 1.0, "handling": 0.7},
+    "ATV": {"weight": 0.9, "power": 0.9, "handling": 1.6}
+}
+
+ROAD_PERCENTAGES = {
+    "visible": 0.27,
+    "long_hidden": 0.46,    "short_hidden": 0.27
+}
+
+weight_map = {"L": 0.8, "C": 1.0, "R": 1.3}
+
+LONG_ROAD_OPTIONS = ["المرئي", "المخفي الأول", "المخفي الثاني"]
+
+# الطرق الوعرة: يُطبَّق عليها معامل التحكم، وعلى الباقي معامل القوة
+ROUGH_ROADS = ["dirt", "potholes", "desert", "bumpy"]
+HANDLING_COEFFICIENT = 0.2
+# على الطرق المعبدة يُقسم الوقت على power ** POWER_EXPONENT
+POWER_EXPONENT = 1.0
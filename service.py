@@ -0,0 +1,138 @@
+import argparse
+import asyncio
+import json
+
+from history_store import HistoryStore
+from metrics import REGISTRY, timer
+from race_codes import POSITIONS, ROADS, VEHICLES
+from storage import RaceStore
+
+DB_PATH = 'racing.db'
+MAX_BODY = 10 * 1024 * 1024
+MAX_BATCH = 10000
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def parse_query(race):
+    # نفس أسماء أعمدة جدول races: Position و Road و Car1..Car3
+    if not isinstance(race, dict):
+        raise BadRequest("each race must be an object")
+    position, road = race.get("Position"), race.get("Road")
+    cars = [race.get("Car1"), race.get("Car2"), race.get("Car3")]
+    if position not in POSITIONS:
+        raise BadRequest(f"invalid Position: {position!r}")
+    if road not in ROADS:
+        raise BadRequest(f"invalid Road: {road!r}")
+    for car in cars:
+        if car not in VEHICLES:
+            raise BadRequest(f"invalid car: {car!r}")
+    return position, road, cars
+
+
+class PredictionService:
+    # خدمة HTTP/JSON محلية فوق asyncio تستخدم نفس السجل الدافئ في الذاكرة
+    def __init__(self, history):
+        self.history = history
+
+    def handle_predict(self, body):
+        try:
+            payload = json.loads(body or b'null')
+        except ValueError:
+            raise BadRequest("body is not valid JSON")
+        races = payload.get("races") if isinstance(payload, dict) else payload
+        if not isinstance(races, list):
+            raise BadRequest('expected a list of races or {"races": [...]}')
+        if len(races) > MAX_BATCH:
+            raise BadRequest(f"batch larger than {MAX_BATCH}")
+
+        # الصفوف غير الصالحة تعيد خطأ في موضعها دون إسقاط الدفعة
+        queries, errors = [], {}
+        for i, race in enumerate(races):
+            try:
+                queries.append(parse_query(race))
+            except BadRequest as e:
+                errors[i] = str(e)
+        with timer("service_predict"):
+            results = iter(self.history.predict_many(queries))
+        predictions = [{"error": errors[i]} if i in errors else next(results) for i in range(len(races))]
+        return {"predictions": predictions, "history_version": self.history.version}
+
+    def dispatch(self, method, path, body):
+        if path == "/health":
+            return 200, {"status": "ok", "races": self.history.count(), "history_version": self.history.version}
+        if path == "/metrics":
+            return 200, dict(REGISTRY.snapshot(), prediction_cache=self.history.cache_stats())
+        if path == "/predict":
+            if method != "POST":
+                return 405, {"error": "use POST"}
+            try:
+                return 200, self.handle_predict(body)
+            except BadRequest as e:
+                return 400, {"error": str(e)}
+        return 404, {"error": "not found"}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY:
+                    status, payload = 413, {"error": "body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload = self.dispatch(method, path.split('?')[0], body)
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON prediction service")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    args = parser.parse_args()
+
+    store = RaceStore(args.db)
+    history = HistoryStore(store.load, store.append)
+    print(f"Loaded {history.count()} races; serving on http://{args.host}:{args.port}")
+    asyncio.run(PredictionService(history).serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
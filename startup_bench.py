@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from storage import RaceStore
+from synthetic import write_synthetic
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+# كل قياس في عملية جديدة: أول عرض للصفحة الرئيسية، ثم (في عملية منفصلة) تحميل السجل كاملًا
+_RENDER_PROBE = '''
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+
+start = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=600)
+at.run()
+print(json.dumps({
+    "first_render_seconds": time.perf_counter() - start,
+    "first_prediction_provisional": any("قيد التحميل" in c.value for c in at.caption),
+    "exception": bool(at.exception),
+}))
+'''
+
+_LOAD_PROBE = '''
+import json, time
+from history_store import HistoryStore
+from storage import RaceStore
+
+start = time.perf_counter()
+store = RaceStore("racing.db")
+HistoryStore(store.load, store.append).start_loading().result()
+print(json.dumps({"history_load_seconds": time.perf_counter() - start}))
+'''
+
+
+def _probe(code, cwd, *args):
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(APP_PATH))
+    out = subprocess.run(
+        [sys.executable, '-c', code, *args], cwd=cwd, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def fill_db(path, n, seed=0):
+    store = RaceStore(path)
+    write_synthetic(store, n, seed)
+    store.close()
+
+
+def measure(n, seed=0):
+    with tempfile.TemporaryDirectory() as tmp:
+        fill_db(os.path.join(tmp, 'racing.db'), n, seed)
+        report = {"races": n}
+        report.update(_probe(_RENDER_PROBE, tmp, APP_PATH))
+        report.update(_probe(_LOAD_PROBE, tmp))
+        report["db_mb"] = os.path.getsize(os.path.join(tmp, 'racing.db')) / 1e6
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first render of app.py against history size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 10000, 100000, 1000000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    reports = [measure(n, args.seed) for n in args.sizes]
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+    print("races     first_render_s  provisional  history_load_s")
+    for r in reports:
+        print(f"{r['races']:>8}  {r['first_render_seconds']:>14.3f}  {str(r['first_prediction_provisional']):>11}  "
+              f"{r['history_load_seconds']:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,429 @@
+import logging
+import queue
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+
+from race_codes import CODED_COLUMNS, METHOD_COLUMN, MISSING, RACE_COLUMNS, decode_value, encode_value
+from race_table import RaceTable
+
+logger = logging.getLogger(__name__)
+
+# قيم افتراضية للأعمدة المفقودة في السجلات القديمة
+DEFAULT_VALUES = {
+    "Hidden_Road_1": "dirt",
+    "Hidden_Road_1_Position": "C",
+    "Hidden_Road_2": "potholes",
+    "Hidden_Road_2_Position": "R",
+    "Long_Road": "المرئي",
+}
+
+LOAD_BATCH = 50000
+
+# عدد اتصالات القراءة المشتركة، ومدة انتظار قفل الكتابة (بالثواني) قبل الفشل
+POOL_SIZE = 4
+BUSY_TIMEOUT = 10.0
+
+# كل الأعمدة أرقام صغيرة؛ النصوص في جداول الترميز (race_codes) وجدول prediction_methods
+_CREATE_RACES = '''
+    CREATE TABLE IF NOT EXISTS races (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        Position INTEGER,
+        Road INTEGER,
+        Hidden_Road_1 INTEGER,
+        Hidden_Road_1_Position INTEGER,
+        Hidden_Road_2 INTEGER,
+        Hidden_Road_2_Position INTEGER,
+        Long_Road INTEGER,
+        Car1 INTEGER,
+        Car2 INTEGER,
+        Car3 INTEGER,
+        Winner INTEGER,
+        Prediction INTEGER,
+        Prediction_Method INTEGER
+    )
+'''
+
+_CREATE_METHODS = '''
+    CREATE TABLE IF NOT EXISTS prediction_methods (
+        id INTEGER PRIMARY KEY,
+        label TEXT UNIQUE NOT NULL
+    )
+'''
+
+_CREATE_INDEX = 'CREATE INDEX IF NOT EXISTS idx_races_position_road ON races (Position, Road)'
+# تصفية صفحة السجل بالفائز؛ الفهرس مرتب ضمنيًا بـ id فتُقرأ الصفحة الأحدث دون فرز
+_CREATE_WINNER_INDEX = 'CREATE INDEX IF NOT EXISTS idx_races_winner ON races (Winner)'
+
+# ملخص نسبة الربح: يُحدَّث مع كل إدراج فلا تحتاج الصفحة لمسح السجل
+_CREATE_RACE_SUMMARY = '''
+    CREATE TABLE IF NOT EXISTS race_summary (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total INTEGER NOT NULL,
+        correct INTEGER NOT NULL
+    )
+'''
+
+_CREATE_CAR_SUMMARY = '''
+    CREATE TABLE IF NOT EXISTS car_summary (
+        Car INTEGER PRIMARY KEY,
+        wins INTEGER NOT NULL,
+        correct_predictions INTEGER NOT NULL
+    )
+'''
+
+_UPDATE_RACE_SUMMARY = 'UPDATE race_summary SET total = total + ?, correct = correct + ? WHERE id = 1'
+
+_UPSERT_CAR_SUMMARY = '''
+    INSERT INTO car_summary (Car, wins, correct_predictions) VALUES (?, ?, ?)
+    ON CONFLICT (Car) DO UPDATE SET
+        wins = wins + excluded.wins,
+        correct_predictions = correct_predictions + excluded.correct_predictions
+'''
+
+# أحجام النوافذ المتحركة لنسبة الربح
+ACCURACY_WINDOWS = (100, 1000)
+
+_INSERT_RACE = 'INSERT INTO races ({}) VALUES ({})'.format(
+    ', '.join(RACE_COLUMNS), ', '.join('?' * len(RACE_COLUMNS))
+)
+
+
+def race_to_row(race):
+    return tuple(race.get(col, DEFAULT_VALUES.get(col)) for col in RACE_COLUMNS)
+
+
+def _clean_text(value):
+    # القيم القديمة نصوص قد تحمل مسافات زائدة؛ النص الفارغ قيمة مفقودة
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+class RaceStore:
+    # اتصال كتابة واحد لكل عملية + مجموعة صغيرة من اتصالات القراءة، كلها بوضع WAL.
+    # الكتابة تبدأ بـ BEGIN IMMEDIATE فتنتظر العمليات الأخرى دورها بدل أن تفشل أو تكتب فوق بعضها
+    def __init__(self, db_path, pool_size=POOL_SIZE, busy_timeout=BUSY_TIMEOUT):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self._lock = threading.Lock()
+        self._method_ids = {}
+        self._readers = queue.LifoQueue()
+        self._pool_slots = threading.Semaphore(pool_size)
+        self._all_readers = []
+        self.conn = self._connect()
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self._init_schema()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextmanager
+    def _reader(self):
+        # القراءة لا تنتظر قفل الكاتب: WAL يعطي كل قارئ لقطة ثابتة من آخر معاملة مكتملة
+        with self._pool_slots:
+            try:
+                conn = self._readers.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+                conn.execute('PRAGMA query_only=ON')
+                with self._lock:
+                    self._all_readers.append(conn)
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._readers.put(conn)
+
+    def _init_schema(self):
+        with self._lock, self.conn:
+            # الترحيل وإنشاء الجداول في معاملة واحدة؛ عملية أخرى تفتح نفس الملف تنتظر انتهاءها
+            self.conn.execute('BEGIN IMMEDIATE')
+            columns = {r[1]: r[2].upper() for r in self.conn.execute('PRAGMA table_info(races)')}
+            if columns and columns.get('Position') != 'INTEGER':
+                self.conn.execute('ALTER TABLE races RENAME TO races_text')
+                self._create_tables()
+                self._migrate_text_table(set(columns))
+                self._rebuild_summary()
+            else:
+                self._create_tables()
+            self._reload_method_ids()
+
+    def _create_tables(self):
+        self.conn.execute(_CREATE_RACES)
+        self.conn.execute(_CREATE_METHODS)
+        self.conn.execute(_CREATE_INDEX)
+        self.conn.execute(_CREATE_WINNER_INDEX)
+        self.conn.execute(_CREATE_RACE_SUMMARY)
+        self.conn.execute(_CREATE_CAR_SUMMARY)
+        if self.conn.execute('SELECT COUNT(*) FROM race_summary').fetchone()[0] == 0:
+            self._rebuild_summary()
+
+    def _rebuild_summary(self):
+        # حساب الملخص من الجدول كاملًا: عند إنشائه لأول مرة وبعد الاستعادة من ملف
+        self.conn.execute('DELETE FROM race_summary')
+        self.conn.execute('''
+            INSERT INTO race_summary (id, total, correct)
+            SELECT 1, COUNT(*), COALESCE(SUM(Prediction = Winner), 0) FROM races
+        ''')
+        self.conn.execute('DELETE FROM car_summary')
+        self.conn.execute('''
+            INSERT INTO car_summary (Car, wins, correct_predictions)
+            SELECT Winner, COUNT(*), SUM(COALESCE(Prediction = Winner, 0)) FROM races
+            WHERE Winner IS NOT NULL GROUP BY Winner
+        ''')
+
+    def _update_summary(self, rows):
+        winner_col = RACE_COLUMNS.index("Winner")
+        prediction_col = RACE_COLUMNS.index("Prediction")
+        correct = 0
+        cars = {}
+        for row in rows:
+            winner = row[winner_col]
+            hit = winner is not None and row[prediction_col] == winner
+            correct += hit
+            if winner is not None:
+                wins, hits = cars.get(winner, (0, 0))
+                cars[winner] = (wins + 1, hits + hit)
+        self.conn.execute(_UPDATE_RACE_SUMMARY, (len(rows), correct))
+        self.conn.executemany(_UPSERT_CAR_SUMMARY, [(car, w, h) for car, (w, h) in cars.items()])
+
+    def _migrate_text_table(self, existing):
+        # الجدول القديم نصي (وقد تنقصه أعمدة إذا أنشأه to_sql)؛ يُنقل إلى الأرقام مرة واحدة.
+        # القيم تُنظَّف من المسافات قبل الترميز، وما لا يُعرف منها يُعدّ ويُسجَّل، ويبقى races_text نسخة احتياطية
+        select = ', '.join(col if col in existing else 'NULL' for col in RACE_COLUMNS)
+        cur = self.conn.execute(f'SELECT {select} FROM races_text ORDER BY rowid')
+        lossy_rows = 0
+        unknown = Counter()
+        while True:
+            rows = cur.fetchmany(LOAD_BATCH)
+            if not rows:
+                break
+            encoded = []
+            for row in rows:
+                row = tuple(_clean_text(value) for value in row)
+                codes = self._encode_row(row)
+                lost = [
+                    (col, value) for col, value, code in zip(CODED_COLUMNS, row, codes)
+                    if value is not None and code is None
+                ]
+                lossy_rows += bool(lost)
+                unknown.update(lost)
+                encoded.append(codes)
+            self.conn.executemany(_INSERT_RACE, encoded)
+        if lossy_rows:
+            details = ', '.join(f'{col}={value!r} x{n}' for (col, value), n in unknown.most_common(10))
+            logger.warning(
+                'Migrated races_text with %d races that had unknown values (stored as NULL): %s. '
+                'The original table is kept as races_text.', lossy_rows, details,
+            )
+
+    def _reload_method_ids(self):
+        self._method_ids = {label: id_ for id_, label in self.conn.execute(
+            'SELECT id, label FROM prediction_methods'
+        )}
+
+    def _method_id(self, label):
+        if label is None or label != label:
+            return None
+        id_ = self._method_ids.get(label)
+        if id_ is None:
+            self.conn.execute('INSERT OR IGNORE INTO prediction_methods (label) VALUES (?)', (label,))
+            id_ = self.conn.execute('SELECT id FROM prediction_methods WHERE label = ?', (label,)).fetchone()[0]
+            self._method_ids[label] = id_
+        return id_
+
+    def _encode_row(self, row):
+        # row: قيم نصية بترتيب RACE_COLUMNS
+        codes = [encode_value(col, value) for col, value in zip(CODED_COLUMNS, row)]
+        return tuple(None if c == MISSING else c for c in codes) + (self._method_id(row[-1]),)
+
+    def _encode_method(self, row):
+        return row[:-1] + (self._method_id(row[-1]),)
+
+    def load(self):
+        table = RaceTable()
+        with self._reader() as conn:
+            conn.execute('BEGIN')
+            method_rows = conn.execute('SELECT id, label FROM prediction_methods').fetchall()
+            method_labels = [None] * (max((r[0] for r in method_rows), default=-1) + 1)
+            for id_, label in method_rows:
+                method_labels[id_] = label
+            select = ', '.join(f'COALESCE({col}, {MISSING})' for col in RACE_COLUMNS)
+            cur = conn.execute(f'SELECT {select} FROM races ORDER BY id')
+            while True:
+                rows = cur.fetchmany(LOAD_BATCH)
+                if not rows:
+                    break
+                block = np.array(rows, dtype=np.int64)
+                table.extend_codes(
+                    {col: block[:, i] for i, col in enumerate(RACE_COLUMNS)}, method_labels
+                )
+        return table
+
+    def append(self, races):
+        # إدراج السجلات الجديدة فقط في معاملة واحدة
+        with self._lock:
+            try:
+                with self.conn:
+                    self.conn.execute('BEGIN IMMEDIATE')
+                    rows = [self._encode_row(race_to_row(r)) for r in races]
+                    if rows:
+                        self.conn.executemany(_INSERT_RACE, rows)
+                        self._update_summary(rows)
+            except Exception:
+                # طرق توقع جديدة أُدرجت داخل المعاملة الملغاة
+                self._reload_method_ids()
+                raise
+        return len(rows)
+
+    def append_codes(self, columns, method_labels):
+        # إدراج أعمدة رموز جاهزة (بصيغة RaceTable.extend_codes) دون المرور بالنصوص
+        with self._lock:
+            try:
+                with self.conn:
+                    self.conn.execute('BEGIN IMMEDIATE')
+                    method_ids = np.array(
+                        [self._method_id(label) or MISSING for label in method_labels] + [MISSING], dtype=np.int64
+                    )
+                    block = np.stack(
+                        [np.asarray(columns[col], dtype=np.int64) for col in CODED_COLUMNS]
+                        + [method_ids[columns[METHOD_COLUMN]]],
+                        axis=1,
+                    )
+                    missing = block == MISSING
+                    block = block.astype(object)
+                    block[missing] = None
+                    rows = [tuple(row) for row in block.tolist()]
+                    if rows:
+                        self.conn.executemany(_INSERT_RACE, rows)
+                        self._update_summary(rows)
+            except Exception:
+                self._reload_method_ids()
+                raise
+        return len(rows)
+
+    def replace_chunks(self, chunks, progress=None, encoded=False):
+        # استبدال السجل من دفعات صفوف متتالية في معاملة واحدة؛ لا يُحذف شيء إذا فشل الاستيراد
+        # encoded: الصفوف أكواد جاهزة (None للمفقود) وآخر قيمة نص طريقة التوقع
+        encode = self._encode_method if encoded else self._encode_row
+        total = 0
+        with self._lock:
+            try:
+                with self.conn:
+                    self.conn.execute('BEGIN IMMEDIATE')
+                    self.conn.execute('DELETE FROM races')
+                    for rows in chunks:
+                        self.conn.executemany(_INSERT_RACE, [encode(row) for row in rows])
+                        total += len(rows)
+                        if progress is not None:
+                            progress(total)
+                    self._rebuild_summary()
+            except Exception:
+                self._reload_method_ids()
+                raise
+        return total
+
+    def method_labels(self):
+        # من الجدول لا من الذاكرة: عمليات أخرى قد تضيف طرقًا جديدة
+        with self._reader() as conn:
+            return dict(conn.execute('SELECT id, label FROM prediction_methods'))
+
+    def iter_code_batches(self, columns=RACE_COLUMNS, min_id=None, max_id=None, batch_size=LOAD_BATCH):
+        # دفعات (ids, {عمود: أكواد}) مرتبة حسب id؛ القفل يُحرَّر بين الدفعات فلا يتوقف الحفظ أثناء التصدير
+        select = ', '.join(['id'] + [f'COALESCE({col}, {MISSING})' for col in columns])
+        last = (min_id - 1) if min_id is not None else -1
+        upper = max_id if max_id is not None else -1
+        while True:
+            with self._reader() as conn:
+                rows = conn.execute(
+                    f'SELECT {select} FROM races WHERE id > ? AND (? < 0 OR id <= ?) ORDER BY id LIMIT ?',
+                    (last, upper, upper, batch_size),
+                ).fetchall()
+            if not rows:
+                break
+            block = np.array(rows, dtype=np.int64)
+            last = int(block[-1, 0])
+            yield block[:, 0], {col: block[:, i + 1] for i, col in enumerate(columns)}
+
+    def _where(self, filters):
+        # filters: {عمود: قيمة نصية}؛ تتحول إلى مقارنات أرقام
+        clauses, params = [], []
+        for col, value in (filters or {}).items():
+            clauses.append(f'races.{col} = ?')
+            params.append(encode_value(col, value))
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def count(self, filters=None):
+        # بدون تصفية: الإجمالي من race_summary بدل مسح الجدول في كل إعادة عرض
+        where, params = self._where(filters)
+        with self._reader() as conn:
+            if not where:
+                return conn.execute('SELECT total FROM race_summary WHERE id = 1').fetchone()[0]
+            return conn.execute(f'SELECT COUNT(*) FROM races{where}', params).fetchone()[0]
+
+    def fetch_page(self, limit, offset=0, filters=None):
+        # صفحة واحدة من الأحدث إلى الأقدم، مفكوكة الترميز
+        where, params = self._where(filters)
+        columns = ', '.join(f'races.{col}' for col in CODED_COLUMNS)
+        with self._reader() as conn:
+            rows = conn.execute(
+                f'SELECT races.id, {columns}, prediction_methods.label FROM races '
+                f'LEFT JOIN prediction_methods ON prediction_methods.id = races.{METHOD_COLUMN}'
+                f'{where} ORDER BY races.id DESC LIMIT ? OFFSET ?',
+                params + [limit, offset],
+            ).fetchall()
+        page = []
+        for row in rows:
+            race = {"id": row[0]}
+            for col, code in zip(CODED_COLUMNS, row[1:]):
+                race[col] = decode_value(col, code) if code is not None else None
+            race[METHOD_COLUMN] = row[-1]
+            page.append(race)
+        return page
+
+    def summary(self):
+        # الإجماليات من جدولي الملخص، ونسبة آخر N سباق من أحدث الصفوف فقط
+        with self._reader() as conn:
+            conn.execute('BEGIN')
+            total, correct = conn.execute('SELECT total, correct FROM race_summary WHERE id = 1').fetchone()
+            car_rows = conn.execute('SELECT Car, wins, correct_predictions FROM car_summary').fetchall()
+            recent = conn.execute(
+                'SELECT COALESCE(Prediction = Winner, 0) FROM races ORDER BY id DESC LIMIT ?',
+                (max(ACCURACY_WINDOWS),),
+            ).fetchall()
+        hits = np.array([r[0] for r in recent], dtype=np.int64)[::-1]
+        windows = {}
+        for size in ACCURACY_WINDOWS:
+            if len(hits) >= size:
+                windows[size] = float(hits[-size:].mean())
+        # منحنى نسبة آخر 100 سباق عبر آخر 1000 سباق
+        trend_size = min(ACCURACY_WINDOWS)
+        trend = []
+        if len(hits) >= trend_size:
+            cumulative = np.concatenate([[0], np.cumsum(hits)])
+            trend = ((cumulative[trend_size:] - cumulative[:-trend_size]) / trend_size).tolist()
+        return {
+            "total": total,
+            "correct": correct,
+            "cars": {
+                decode_value("Winner", car): {"wins": wins, "correct_predictions": hits_}
+                for car, wins, hits_ in car_rows
+            },
+            "windows": windows,
+            "trend": trend,
+        }
+
+    def close(self):
+        with self._lock:
+            for conn in self._all_readers:
+                conn.close()
+            self._all_readers.clear()
+            self.conn.close()
@@ -0,0 +1,140 @@
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from race_codes import MISSING
+from storage import RaceStore
+from synthetic import synthetic_races
+
+
+def _method(writer):
+    # كل كاتب يوسم سباقاته بطريقة توقع خاصة به لنعدّها بعد الانتهاء
+    return f"stress-{writer}"
+
+
+def _write(db_path, writer, races, batch_size, store=None):
+    own = store is None
+    if own:
+        store = RaceStore(db_path)
+    batches = [
+        [dict(race, Prediction=race["Car1"], Prediction_Method=_method(writer)) for race in races[i:i + batch_size]]
+        for i in range(0, len(races), batch_size)
+    ]
+    try:
+        # الوقت الفعلي للكتابة فقط، دون بدء العملية وفتح الاتصال
+        start = time.time()
+        for batch in batches:
+            store.append(batch)
+        return start, time.time()
+    finally:
+        if own:
+            store.close()
+
+
+def _read_loop(store, stop, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        store.summary()
+        store.fetch_page(50)
+        latencies.append(time.perf_counter() - start)
+
+
+def _verify(store, writers, races_per_writer):
+    # لا سباق مفقود: العدد لكل كاتب، والإجمالي، وجدول الملخص يطابق إعادة الحساب من الجدول
+    expected = {_method(w): races_per_writer for w in range(writers)}
+    labels = store.method_labels()
+    counts = Counter()
+    correct = 0
+    for ids, codes in store.iter_code_batches(["Prediction", "Winner", "Prediction_Method"]):
+        counts.update(labels.get(int(code)) for code in codes["Prediction_Method"])
+        correct += int(((codes["Prediction"] == codes["Winner"]) & (codes["Winner"] != MISSING)).sum())
+    total = store.count()
+    summary = store.summary()
+    return {
+        "expected": writers * races_per_writer,
+        "stored": total,
+        "lost": writers * races_per_writer - total,
+        "per_writer_ok": dict(counts) == expected,
+        "summary_ok": (summary["total"], summary["correct"]) == (total, correct),
+    }
+
+
+def run(writers, races_per_writer, batch_size=1, mode="process", readers=0, seed=0):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "stress.db")
+        store = RaceStore(db_path)
+        workloads = [synthetic_races(races_per_writer, seed + w) for w in range(writers)]
+
+        stop = threading.Event()
+        read_latencies = []
+        reader_threads = [
+            threading.Thread(target=_read_loop, args=(store, stop, read_latencies)) for _ in range(readers)
+        ]
+        for t in reader_threads:
+            t.start()
+
+        if mode == "process":
+            # spawn لا fork: خيوط القراءة قد تحمل أقفال sqlite لحظة إنشاء العملية
+            with ProcessPoolExecutor(writers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = [pool.submit(_write, db_path, w, workloads[w], batch_size) for w in range(writers)]
+                spans = [f.result() for f in futures]
+        else:
+            with ThreadPoolExecutor(writers) as pool:
+                futures = [pool.submit(_write, db_path, w, workloads[w], batch_size, store) for w in range(writers)]
+                spans = [f.result() for f in futures]
+        elapsed = max(end for _, end in spans) - min(start for start, _ in spans)
+
+        stop.set()
+        for t in reader_threads:
+            t.join()
+
+        report = {
+            "mode": mode,
+            "writers": writers,
+            "races_per_writer": races_per_writer,
+            "batch_size": batch_size,
+            "seconds": elapsed,
+            "races_per_second": writers * races_per_writer / elapsed,
+            "commits_per_second": writers * -(-races_per_writer // batch_size) / elapsed,
+            "slowest_writer_seconds": max(end - start for start, end in spans),
+        }
+        if readers:
+            read_latencies.sort()
+            report["reads"] = len(read_latencies)
+            report["read_p95_ms"] = read_latencies[int(0.95 * (len(read_latencies) - 1))] * 1000 if read_latencies else 0.0
+        report.update(_verify(store, writers, races_per_writer))
+        store.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent writers stress test for the SQLite store")
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--races", type=int, default=2000, help="races saved by each writer")
+    parser.add_argument("--batch", type=int, default=1, help="races per transaction")
+    parser.add_argument("--mode", choices=["process", "thread"], default="process")
+    parser.add_argument("--readers", type=int, default=2, help="reader threads running during the writes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    reports = [run(n, args.races, args.batch, args.mode, args.readers, args.seed) for n in args.writers]
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+    print("writers  races/s  commits/s  read_p95_ms  lost  per_writer_ok  summary_ok")
+    for r in reports:
+        print(f"{r['writers']:>7}  {r['races_per_second']:>7.0f}  {r['commits_per_second']:>9.0f}  "
+              f"{r.get('read_p95_ms', 0.0):>11.2f}  {r['lost']:>4}  {str(r['per_writer_ok']):>13}  {str(r['summary_ok']):>10}")
+    if any(r["lost"] or not r["per_writer_ok"] or not r["summary_ok"] for r in reports):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backtest import is_valid
+from engine import LONG_ROAD_CODES, POSITION_CODES, ROAD_CODES, VEHICLE_CODES, TimeModel
+from history_index import HistoryIndex
+from predictor import HISTORY_THRESHOLD, historical_prediction, infer_layout
+from race_codes import MISSING
+from racing_config import (
+    weight_map, ROAD_PERCENTAGES, road_weights_config, HANDLING_COEFFICIENT, POWER_EXPONENT,
+)
+from storage import RaceStore
+
+DB_PATH = 'racing.db'
+
+# ترتيب أعمدة مصفوفة السباقات المشتركة بين العمليات؛ الطرق المخفية والطريق الأطول هي ما يستنتجه
+# التطبيق لحظة التوقع لا ما سُجّل بعد السباق، و Historical توقع السجل (MISSING إذا لجأ التطبيق لنموذج الوقت)
+MATRIX_COLUMNS = [
+    "Position", "Road", "Hidden_Road_1", "Hidden_Road_1_Position", "Hidden_Road_2",
+    "Hidden_Road_2_Position", "Long_Road", "Car1", "Car2", "Car3", "Winner", "Historical",
+]
+
+GRID = {
+    "weight_L": [0.6, 0.8, 1.0],
+    "weight_R": [1.0, 1.3, 1.6],
+    "long_share": [0.40, 0.46, 0.52],
+    "handling_coefficient": [0.1, 0.2, 0.3],
+    "power_exponent": [0.5, 1.0, 1.5],
+    "use_road_weights": [False, True],
+}
+
+RANDOM_RANGES = {
+    "weight_L": (0.5, 1.2),
+    "weight_R": (0.9, 1.8),
+    "long_share": (0.34, 0.6),
+    "handling_coefficient": (0.0, 0.4),
+    "power_exponent": (0.0, 2.0),
+}
+
+DEFAULT_CONFIG = {
+    "weight_L": weight_map["L"],
+    "weight_R": weight_map["R"],
+    "long_share": ROAD_PERCENTAGES["long_hidden"],
+    "handling_coefficient": HANDLING_COEFFICIENT,
+    "power_exponent": POWER_EXPONENT,
+    "use_road_weights": False,
+}
+
+
+def races_matrix(races):
+    # إعادة تشغيل السجل بالترتيب كما في backtest: كل سباق بمدخلات التطبيق من السباقات السابقة فقط.
+    # هذه المدخلات والتوقع التاريخي لا تعتمد على ثوابت نموذج الوقت، فتُحسب مرة واحدة للبحث كله
+    index = HistoryIndex()
+    rows = []
+    for race in races:
+        if is_valid(race):
+            position, road = race["Position"], race["Road"]
+            cars = [race["Car1"], race["Car2"], race["Car3"]]
+            historical = None
+            if index.total > HISTORY_THRESHOLD:
+                historical = historical_prediction(index, position, road, cars)
+            hidden_roads, hidden_positions, long_road = infer_layout(index, position, road)
+            rows.append((
+                POSITION_CODES[position], ROAD_CODES[road],
+                ROAD_CODES[hidden_roads[0]], POSITION_CODES[hidden_positions[0]],
+                ROAD_CODES[hidden_roads[1]], POSITION_CODES[hidden_positions[1]],
+                LONG_ROAD_CODES[long_road],
+                VEHICLE_CODES[cars[0]], VEHICLE_CODES[cars[1]], VEHICLE_CODES[cars[2]],
+                VEHICLE_CODES.get(race.get("Winner"), MISSING),
+                VEHICLE_CODES[historical] if historical is not None else MISSING,
+            ))
+        index.add(race)
+    return np.array(rows, dtype=np.int8).reshape(-1, len(MATRIX_COLUMNS))
+
+
+def build_model(config):
+    long_share = config["long_share"]
+    return TimeModel(
+        weight_map={"L": config["weight_L"], "C": weight_map["C"], "R": config["weight_R"]},
+        road_percentages={"long_hidden": long_share, "short_hidden": (1.0 - long_share) / 2},
+        handling_coefficient=config["handling_coefficient"],
+        power_exponent=config["power_exponent"],
+        road_weights=road_weights_config if config["use_road_weights"] else None,
+    )
+
+
+def score(matrix, config):
+    # نفس دقة backtest مع هذا النموذج: التوقع التاريخي حيث وُجد، ونموذج الوقت للباقي
+    if not len(matrix):
+        return 0.0
+    model = build_model(config)
+    predicted = matrix[:, 11].astype(np.int64)
+    physics = predicted == MISSING
+    rows = matrix[physics]
+    predicted[physics] = model.predict_codes(*(rows[:, i] for i in range(7)), rows[:, 7:10])
+    return float(np.mean(predicted == matrix[:, 10]))
+
+
+# --- مشاركة المصفوفة مع العمليات عبر الذاكرة المشتركة بدل نسخها لكل عامل ---
+_worker_shm = None
+_worker_matrix = None
+
+
+def _attach(name, shape):
+    global _worker_shm, _worker_matrix
+    _worker_shm = shared_memory.SharedMemory(name=name)
+    _worker_matrix = np.ndarray(shape, dtype=np.int8, buffer=_worker_shm.buf)
+
+
+def _evaluate(config):
+    return dict(config, accuracy=score(_worker_matrix, config))
+
+
+def grid_configs():
+    keys = list(GRID)
+    return [dict(zip(keys, values)) for values in itertools.product(*(GRID[k] for k in keys))]
+
+
+def random_configs(n, seed):
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(n):
+        config = {k: round(rng.uniform(lo, hi), 4) for k, (lo, hi) in RANDOM_RANGES.items()}
+        config["use_road_weights"] = rng.random() < 0.5
+        configs.append(config)
+    return configs
+
+
+def run_sweep(matrix, configs, workers=None):
+    shm = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    try:
+        shared = np.ndarray(matrix.shape, dtype=np.int8, buffer=shm.buf)
+        shared[:] = matrix
+        workers = workers or os.cpu_count()
+        chunksize = max(len(configs) // (workers * 4), 1)
+        with ProcessPoolExecutor(workers, initializer=_attach, initargs=(shm.name, matrix.shape)) as pool:
+            results = list(pool.map(_evaluate, configs, chunksize=chunksize))
+    finally:
+        shm.close()
+        shm.unlink()
+    results.sort(key=lambda r: -r["accuracy"])
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel sweep over the time-model constants")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--synthetic", type=int, metavar="N", help="sweep over N synthetic races instead of the DB")
+    parser.add_argument("--random", type=int, metavar="N", help="random search with N configs instead of the grid")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="print the full ranked table as JSON")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        from synthetic import synthetic_table
+        table = synthetic_table(args.synthetic, args.seed)
+    else:
+        store = RaceStore(args.db)
+        table = store.load()
+        store.close()
+    matrix = races_matrix(table)
+
+    configs = random_configs(args.random, args.seed) if args.random else grid_configs()
+    configs.append(dict(DEFAULT_CONFIG))
+    start = time.perf_counter()
+    results = run_sweep(matrix, configs, args.workers)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    baseline = next(i for i, r in enumerate(results) if all(r[k] == v for k, v in DEFAULT_CONFIG.items()))
+    print(f"{len(configs)} configs x {len(matrix)} races in {elapsed:.2f}s")
+    print(f"Current constants: rank {baseline + 1}, accuracy {results[baseline]['accuracy'] * 100:.2f}%")
+    header = ["rank", "accuracy"] + list(DEFAULT_CONFIG)
+    print("  ".join(header))
+    for rank, r in enumerate(results[:args.top], 1):
+        print("  ".join([str(rank), f"{r['accuracy'] * 100:.2f}%"] + [str(r[k]) for k in DEFAULT_CONFIG]))
+
+
+if __name__ == "__main__":
+    main()
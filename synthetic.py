@@ -0,0 +1,78 @@
+import numpy as np
+
+from engine import DEFAULT_MODEL, LONG_ROAD_CODES, POSITION_CODES, ROAD_CODES
+from predictor import DEFAULT_HIDDEN_POSITIONS, DEFAULT_LONG_ROAD
+from race_codes import CODED_COLUMNS, METHOD_COLUMN, POSITIONS, ROADS, VEHICLES
+from race_table import RaceTable
+from racing_config import hidden_roads_map
+
+# السباقات تُولَّد على دفعات ثابتة الحجم، فالناتج يعتمد على (n, seed) فقط
+GENERATE_BATCH = 100000
+
+# نسبة السباقات التي طرقها المخفية هي المعتادة لطريقها المرئي في hidden_roads_map
+MAPPED_HIDDEN_SHARE = 0.8
+
+# تذبذب وقت كل سيارة حول نموذج الفيزياء (انحراف معياري لوغاريتمي)
+TIME_NOISE = 0.15
+
+_HIDDEN_MAP = np.array([[ROAD_CODES[r] for r in hidden_roads_map[road]] for road in ROADS], dtype=np.int8)
+
+# ما يتوقعه التطبيق بلا سجل: نموذج الوقت على الطرق المخفية والمواضع الافتراضية
+_TIME_METHOD = f"الوقت (الطريق الأطول: {DEFAULT_LONG_ROAD})"
+
+
+def _generate(rng, n, model):
+    position = rng.integers(0, len(POSITIONS), n)
+    road = rng.integers(0, len(ROADS), n)
+    mapped = _HIDDEN_MAP[road]
+    hidden = [
+        np.where(rng.random(n) < MAPPED_HIDDEN_SHARE, mapped[:, i], rng.integers(0, len(ROADS), n))
+        for i in range(2)
+    ]
+    hidden_pos = [rng.integers(0, len(POSITIONS), n) for _ in range(2)]
+    long_road = rng.integers(0, len(LONG_ROAD_CODES), n)
+    cars = rng.integers(0, len(VEHICLES), (n, 3))
+
+    # الفائز: أقل وقت من نموذج الفيزياء (speed_data و car_properties) بعد إضافة التذبذب
+    times = model.race_times(position, road, hidden[0], hidden_pos[0], hidden[1], hidden_pos[1], long_road, cars)
+    times = times * rng.lognormal(0.0, TIME_NOISE, times.shape)
+    winner = cars[np.arange(n), times.argmin(axis=1)]
+
+    default_pos = [np.full(n, POSITION_CODES[p]) for p in DEFAULT_HIDDEN_POSITIONS]
+    prediction = model.predict_codes(
+        position, road, mapped[:, 0], default_pos[0], mapped[:, 1], default_pos[1],
+        np.full(n, LONG_ROAD_CODES[DEFAULT_LONG_ROAD]), cars,
+    )
+
+    values = [position, road, hidden[0], hidden_pos[0], hidden[1], hidden_pos[1], long_road,
+              cars[:, 0], cars[:, 1], cars[:, 2], winner, prediction]
+    columns = {col: np.asarray(v, dtype=np.int8) for col, v in zip(CODED_COLUMNS, values)}
+    columns[METHOD_COLUMN] = np.zeros(n, dtype=np.int32)
+    return columns
+
+
+def iter_synthetic(n, seed=0, model=None):
+    # دفعات (أعمدة رموز بأسماء جدول races، قائمة طرق التوقع) كما يقبلها RaceTable.extend_codes
+    rng = np.random.default_rng(seed)
+    model = model or DEFAULT_MODEL
+    for start in range(0, n, GENERATE_BATCH):
+        yield _generate(rng, min(GENERATE_BATCH, n - start), model), [_TIME_METHOD]
+
+
+def synthetic_table(n, seed=0, model=None):
+    table = RaceTable(capacity=max(n, 1))
+    for columns, method_labels in iter_synthetic(n, seed, model):
+        table.extend_codes(columns, method_labels)
+    return table
+
+
+def synthetic_races(n, seed=0, model=None):
+    return list(synthetic_table(n, seed, model))
+
+
+def write_synthetic(store, n, seed=0, model=None):
+    # كتابة مباشرة في جدول races بالرموز، دفعة في كل معاملة
+    total = 0
+    for columns, method_labels in iter_synthetic(n, seed, model):
+        total += store.append_codes(columns, method_labels)
+    return total
@@ -0,0 +1,88 @@
+import logging
+import sqlite3
+
+import pandas as pd
+
+from race_codes import RACE_COLUMNS
+from storage import RaceStore
+
+# سباق كامل بقيم صالحة كما كان يحفظه app.py القديم
+_RACE = {
+    "Position": "L",
+    "Road": "highway",
+    "Hidden_Road_1": "expressway",
+    "Hidden_Road_1_Position": "C",
+    "Hidden_Road_2": "dirt",
+    "Hidden_Road_2_Position": "R",
+    "Long_Road": "المخفي الأول",
+    "Car1": "Car",
+    "Car2": "Sport",
+    "Car3": "ORV",
+    "Winner": "Sport",
+    "Prediction": "Sport",
+    "Prediction_Method": "التاريخي (دقة عالية)",
+}
+
+
+def _legacy_db(path, races):
+    # نفس طريقة save_history القديمة: to_sql ينشئ جدولًا أعمدته TEXT
+    conn = sqlite3.connect(path)
+    pd.DataFrame(races).to_sql('races', conn, if_exists='replace', index=False)
+    conn.close()
+
+
+def test_migrates_text_table(tmp_path, caplog):
+    padded = {col: f"  {value} " for col, value in _RACE.items()}
+    unknown = dict(_RACE, Car3="Bogus", Prediction="Car")
+    empty = dict(_RACE, Long_Road="", Winner="Car", Prediction="Car", Prediction_Method="الوقت")
+    legacy = [_RACE, padded, unknown, empty]
+    db_path = str(tmp_path / "racing.db")
+    _legacy_db(db_path, legacy)
+
+    with caplog.at_level(logging.WARNING, logger="storage"):
+        store = RaceStore(db_path)
+    races = list(store.load())
+
+    # المسافات تُزال، والقيمة غير المعروفة والنص الفارغ يصبحان None
+    assert races[0] == _RACE
+    assert races[1] == _RACE
+    assert races[2] == dict(unknown, Car3=None)
+    assert races[3] == dict(empty, Long_Road=None)
+
+    # سباق واحد فقد قيمة غير معروفة؛ النص الفارغ قيمة مفقودة لا خسارة
+    messages = [r.getMessage() for r in caplog.records]
+    assert len(messages) == 1
+    assert "1 races" in messages[0] and "Car3='Bogus' x1" in messages[0]
+
+    # جدولا الملخص يُعاد حسابهما من السباقات المرحّلة
+    summary = store.summary()
+    assert summary["total"] == 4
+    assert summary["correct"] == 3
+    assert summary["cars"] == {
+        "Sport": {"wins": 3, "correct_predictions": 2},
+        "Car": {"wins": 1, "correct_predictions": 1},
+    }
+    assert store.count() == 4
+    store.close()
+
+    # الجدول القديم يبقى كما هو، وإعادة الفتح لا ترحّل مرة أخرى
+    conn = sqlite3.connect(db_path)
+    kept = conn.execute(f"SELECT {', '.join(RACE_COLUMNS)} FROM races_text ORDER BY rowid").fetchall()
+    conn.close()
+    assert kept == [tuple(race[col] for col in RACE_COLUMNS) for race in legacy]
+    store = RaceStore(db_path)
+    assert store.count() == 4
+    assert list(store.load()) == races
+    store.close()
+
+
+def test_migrates_table_with_missing_columns(tmp_path):
+    # سجل قديم حُفظ قبل إضافة Long_Road و Prediction_Method
+    legacy = [{col: value for col, value in _RACE.items() if col not in ("Long_Road", "Prediction_Method")}]
+    db_path = str(tmp_path / "racing.db")
+    _legacy_db(db_path, legacy)
+
+    store = RaceStore(db_path)
+    assert list(store.load()) == [dict(_RACE, Long_Road=None, Prediction_Method=None)]
+    assert store.summary()["total"] == 1
+    store.close()
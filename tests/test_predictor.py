@@ -0,0 +1,129 @@
+import pandas as pd
+
+from predictor import HISTORY_THRESHOLD, Predictor
+from racing_config import (
+    speed_data, car_properties, weight_map, hidden_roads_map, ROAD_PERCENTAGES,
+    ROUGH_ROADS, HANDLING_COEFFICIENT, POWER_EXPONENT,
+)
+from synthetic import synthetic_races
+
+
+def _reference_times(position, road, cars, hidden_roads, hidden_positions, long_road):
+    # حلقة الوقت من app.py القديم، سيارة سيارة
+    times = []
+    for car in cars:
+        car_idx = speed_data["Vehicle"].index(car)
+        visible_speed = speed_data[road][car_idx] * weight_map[position]
+        hidden_speed1 = speed_data[hidden_roads[0]][car_idx] * weight_map.get(hidden_positions[0], 1.0)
+        hidden_speed2 = speed_data[hidden_roads[1]][car_idx] * weight_map.get(hidden_positions[1], 1.0)
+        long_share, short_share = ROAD_PERCENTAGES["long_hidden"], ROAD_PERCENTAGES["short_hidden"]
+        if long_road == "المرئي":
+            total_time = long_share / visible_speed + short_share / hidden_speed1 + short_share / hidden_speed2
+        elif long_road == "المخفي الأول":
+            total_time = short_share / visible_speed + long_share / hidden_speed1 + short_share / hidden_speed2
+        else:
+            total_time = short_share / visible_speed + short_share / hidden_speed1 + long_share / hidden_speed2
+        if road in ROUGH_ROADS:
+            total_time *= (1.0 - car_properties[car]["handling"] * HANDLING_COEFFICIENT)
+        else:
+            total_time *= (1.0 / car_properties[car]["power"] ** POWER_EXPONENT)
+        times.append(total_time)
+    return times
+
+
+def _reference_layout(road_matches, road):
+    # منوال الطرق المخفية ومواضعها والطريق الأطول بـ pandas mode() كما في app.py القديم
+    hidden_roads = hidden_roads_map.get(road, ["dirt", "potholes"])
+    hidden_positions = ["C", "C"]
+    long_road = "المرئي"
+    if road_matches is not None:
+        full_pair = (
+            road_matches['Hidden_Road_1'] + ',' + road_matches['Hidden_Road_1_Position'] + ',' +
+            road_matches['Hidden_Road_2'] + ',' + road_matches['Hidden_Road_2_Position']
+        )
+        mode_series = full_pair.mode()
+        if not mode_series.empty:
+            parts = mode_series.iloc[0].split(',')
+            hidden_roads = [parts[0], parts[2]]
+            hidden_positions = [parts[1], parts[3]]
+        mode_series = road_matches['Long_Road'].mode()
+        if not mode_series.empty:
+            long_road = mode_series.iloc[0]
+    return hidden_roads, hidden_positions, long_road
+
+
+class _Reference:
+    # السجل مقسّم حسب (Position, Road) مرة واحدة، ومنوال كل خلية يُحسب عند أول استعلام عنها
+    def __init__(self, history):
+        self.active = len(history) > HISTORY_THRESHOLD
+        self.cells = dict(tuple(pd.DataFrame(history).groupby(['Position', 'Road']))) if self.active else {}
+        self.layouts = {}
+
+    def layout(self, position, road):
+        key = (position, road)
+        if key not in self.layouts:
+            self.layouts[key] = _reference_layout(self.cells.get(key), road)
+        return self.layouts[key]
+
+
+def _reference_predict(reference, position, road, cars):
+    # مسار التنبؤ من app.py القديم: السباقات المشابهة أولًا، وإلا نموذج الوقت على منوال الخلية
+    hidden_roads, hidden_positions, long_road = reference.layout(position, road)
+    if not reference.active:
+        method = f"الوقت (الطريق الأطول: {long_road})"
+    else:
+        road_matches = reference.cells.get((position, road))
+        if road_matches is not None:
+            similar_matches = road_matches[
+                road_matches['Car1'].isin(cars) & road_matches['Car2'].isin(cars) & road_matches['Car3'].isin(cars)
+            ]
+            if len(similar_matches) >= 1:
+                win_counts = {car: int((similar_matches['Winner'] == car).sum()) for car in cars}
+                return max(win_counts, key=win_counts.get), "التاريخي (دقة عالية)", hidden_roads, hidden_positions
+        method = f"المدمج (الطريق الأطول: {long_road})"
+    times = _reference_times(position, road, cars, hidden_roads, hidden_positions, long_road)
+    return cars[times.index(min(times))], method, hidden_roads, hidden_positions
+
+
+def _queries(n, seed):
+    return [(r["Position"], r["Road"], [r["Car1"], r["Car2"], r["Car3"]]) for r in synthetic_races(n, seed)]
+
+
+def _history(n, seed):
+    # جزء من السباقات بلا طريق أطول، كما في السجلات المستعادة من ملفات ناقصة
+    races = synthetic_races(n, seed)
+    for race in races[::7]:
+        race["Long_Road"] = None
+    return races
+
+
+def _check(predictor, history, queries):
+    reference = _Reference(history)
+    mismatches = []
+    for position, road, cars in queries:
+        result = predictor.predict(position, road, cars)
+        expected = _reference_predict(reference, position, road, cars)
+        actual = (result["prediction"], result["method"], result["hidden_roads"], result["hidden_positions"])
+        if actual != expected:
+            mismatches.append(((position, road, cars), actual, expected))
+    assert mismatches == []
+
+
+def test_matches_reference_on_full_history():
+    history = _history(2000, 1)
+    _check(Predictor(history), history, _queries(3000, 2))
+
+
+def test_matches_reference_below_threshold():
+    history = _history(HISTORY_THRESHOLD, 3)
+    _check(Predictor(history), history, _queries(500, 4))
+
+
+def test_matches_reference_while_history_grows():
+    # الفهرس والجدول يُحدَّثان مع كل سباق، بما في ذلك لحظة تجاوز العتبة
+    races = _history(200, 5)
+    queries = _queries(len(races), 6)
+    predictor = Predictor()
+    for i, race in enumerate(races):
+        _check(predictor, races[:i], [queries[i]])
+        predictor.add(race)